@@ -0,0 +1,61 @@
+import argparse
+import time
+
+from decoder import decode_payload_bitarray
+from fastdecode import decode_payload
+
+# Used when no log file is given
+SAMPLE_PAYLOADS = [
+    "1815UdP000Ld<0aj<F76cC5f0@Q6",
+    "1:U79tHP00LcesOjEcbWdOwf26sd",
+    "1:U90NPP00td51wjAAf=Kgwh00Rd",
+    "B08el30007;1a@LTHEdhpWM00<00",
+    "B:U7EVh00;?8mP=18D3Q3wwP2h06",
+]
+
+def load_payloads(filename, limit):
+    """Collect single-fragment, non-empty payloads from an NMEA log."""
+    payloads = []
+    with open(filename, 'r') as f:
+        for line in f:
+            parts = line.split(',')
+            if len(parts) < 6 or parts[1] != '1' or not parts[5]:
+                continue
+            payloads.append(parts[5])
+            if len(payloads) >= limit:
+                break
+    return payloads
+
+def time_decoder(decode, payloads, repeat):
+    """Return the best messages/sec over repeat runs."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for payload in payloads:
+            decode(payload)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(payloads) / best
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark AIS payload decoders')
+    parser.add_argument('file', nargs='?', help='NMEA log to take payloads from')
+    parser.add_argument('--limit', '-n', type=int, default=100000, help='Maximum payloads to decode')
+    parser.add_argument('--repeat', '-r', type=int, default=3, help='Runs per decoder (best is reported)')
+    args = parser.parse_args()
+
+    if args.file:
+        payloads = load_payloads(args.file, args.limit)
+    else:
+        payloads = (SAMPLE_PAYLOADS * (args.limit // len(SAMPLE_PAYLOADS) + 1))[:args.limit]
+    print(f"Decoding {len(payloads)} payloads, best of {args.repeat} runs")
+
+    bitarray_rate = time_decoder(decode_payload_bitarray, payloads, args.repeat)
+    fast_rate = time_decoder(decode_payload, payloads, args.repeat)
+
+    print(f"BitArray decoder:     {bitarray_rate:12,.0f} msg/s")
+    print(f"Table-driven decoder: {fast_rate:12,.0f} msg/s")
+    print(f"Speedup: {fast_rate / bitarray_rate:.1f}x")
+
+if __name__ == "__main__":
+    main()
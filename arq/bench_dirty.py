@@ -0,0 +1,76 @@
+import argparse
+import random
+import time
+
+from bench_decode import SAMPLE_PAYLOADS, load_payloads
+from records import decode_record, try_decode_record
+
+# Payloads a noisy receiver produces: empty fields, line noise, cut-off text
+JUNK_PAYLOADS = [
+    "",
+    "13u?etPv2;0n:dDPwUM1U1Cb069D~~",
+    "B52K>;h00Fc>jpUlNV@ikwpUoP\x06",
+    "15MgK45P3@G?fl0E`JbR0OwT0@MS!AIVDM",
+]
+
+def dirty_sample(payloads, fraction, seed=0):
+    """Replace about fraction of payloads with junk."""
+    rng = random.Random(seed)
+    return [rng.choice(JUNK_PAYLOADS) if rng.random() < fraction else payload for payload in payloads]
+
+def with_exceptions(payloads):
+    decoded = errors = 0
+    for payload in payloads:
+        try:
+            decode_record(payload)
+            decoded += 1
+        except ValueError:
+            errors += 1
+    return decoded, errors
+
+def with_status(payloads):
+    decoded = errors = 0
+    for payload in payloads:
+        status, record, error = try_decode_record(payload)
+        if record is None:
+            errors += 1
+        else:
+            decoded += 1
+    return decoded, errors
+
+def time_loop(loop, payloads, repeat):
+    """Return the best messages/sec over repeat runs and the loop's counts."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        counts = loop(payloads)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(payloads) / best, counts
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark exception vs status-code decoding on a dirty feed')
+    parser.add_argument('file', nargs='?', help='NMEA log to take payloads from')
+    parser.add_argument('--limit', '-n', type=int, default=100000, help='Maximum payloads to decode')
+    parser.add_argument('--repeat', '-r', type=int, default=3, help='Runs per loop (best is reported)')
+    parser.add_argument('--dirty', type=float, nargs='+', default=[0.0, 0.01, 0.1, 0.5],
+                        help='Fractions of junk payloads to test')
+    args = parser.parse_args()
+
+    if args.file:
+        payloads = load_payloads(args.file, args.limit)
+    else:
+        payloads = (SAMPLE_PAYLOADS * (args.limit // len(SAMPLE_PAYLOADS) + 1))[:args.limit]
+    print(f"Decoding {len(payloads)} payloads, best of {args.repeat} runs")
+
+    for fraction in args.dirty:
+        sample = dirty_sample(payloads, fraction)
+        raise_rate, raise_counts = time_loop(with_exceptions, sample, args.repeat)
+        status_rate, status_counts = time_loop(with_status, sample, args.repeat)
+        assert raise_counts == status_counts
+        print(f"{fraction:6.1%} junk ({status_counts[1]} errors): "
+              f"exceptions {raise_rate:12,.0f} msg/s, status {status_rate:12,.0f} msg/s "
+              f"({status_rate / raise_rate:.2f}x)")
+
+if __name__ == "__main__":
+    main()
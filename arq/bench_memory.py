@@ -0,0 +1,45 @@
+import argparse
+import gc
+import time
+import tracemalloc
+
+from bench_decode import SAMPLE_PAYLOADS, load_payloads
+from fastdecode import decode_payload
+from records import decode_record
+
+def measure(decode, payloads):
+    """Return (bytes retained per message, seconds) for decoding all payloads.
+
+    Times include tracemalloc overhead; use bench_decode.py for throughput.
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    decoded = [decode(payload) for payload in payloads]
+    elapsed = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del decoded
+    return retained / len(payloads), elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare memory of dict and __slots__ message records')
+    parser.add_argument('file', nargs='?', help='NMEA log to take payloads from')
+    parser.add_argument('--limit', '-n', type=int, default=100000, help='Maximum payloads to decode')
+    args = parser.parse_args()
+
+    if args.file:
+        payloads = load_payloads(args.file, args.limit)
+    else:
+        payloads = (SAMPLE_PAYLOADS * (args.limit // len(SAMPLE_PAYLOADS) + 1))[:args.limit]
+    print(f"Decoding {len(payloads)} payloads and keeping the results")
+
+    dict_bytes, dict_time = measure(decode_payload, payloads)
+    record_bytes, record_time = measure(decode_record, payloads)
+
+    print(f"dict messages:     {dict_bytes:8,.0f} bytes/msg  {dict_time:6.2f} s")
+    print(f"__slots__ records: {record_bytes:8,.0f} bytes/msg  {record_time:6.2f} s")
+    print(f"Memory reduction: {dict_bytes / record_bytes:.1f}x")
+
+if __name__ == "__main__":
+    main()
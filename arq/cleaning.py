@@ -0,0 +1,126 @@
+"""Vectorized cleaning of decoded AIS position data.
+
+Range checks and AIS "not available" sentinels are described by RULES and
+evaluated for all numeric columns in one mask; string columns are stripped
+and stored as categoricals; each MMSI's vessel name is resolved to its most
+frequent value with a single groupby. Every step is linear in the number of
+rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Column -> (minimum, maximum, sentinel values meaning "not available").
+# Values outside the range or equal to a sentinel become NaN.
+RULES = {
+    'lat': (-90.0, 90.0, (91.0,)),
+    'lon': (-180.0, 180.0, (181.0,)),
+    'sog': (0.0, 50.0, (102.3,)),  # 50 knots as max realistic speed
+    'cog': (0.0, 360.0, (360.0,)),
+    'heading': (0.0, 360.0, (511.0,)),
+    'rot': (-720.0, 720.0, (-128.0,)),  # -128: no turn information
+    'mi': (0.0, 2.0, ()),  # 0 = not available, 1 = not engaged, 2 = special maneuver
+}
+
+# String column -> value used for missing entries
+STRING_FILLS = {
+    'vessel_name': 'Unknown',
+    'call_sign': '',
+    'nas': 'Unknown',
+}
+
+
+def invalid_mask(df, rules=RULES):
+    """Return (columns, values, mask) for the rule columns present in df.
+
+    values is a float64 matrix of those columns and mask flags entries that
+    are out of range or sentinels.
+    """
+    columns = [column for column in rules if column in df]
+    values = np.column_stack([
+        pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        for column in columns
+    ]) if columns else np.empty((len(df), 0))
+    low = np.array([rules[column][0] for column in columns])
+    high = np.array([rules[column][1] for column in columns])
+    with np.errstate(invalid='ignore'):
+        mask = (values < low) | (values > high)
+    for index, column in enumerate(columns):
+        sentinels = rules[column][2]
+        if sentinels:
+            mask[:, index] |= np.isin(values[:, index], sentinels)
+    return columns, values, mask
+
+
+def apply_rules(df, rules=RULES):
+    """Replace invalid numeric values with NaN; returns {column: count}."""
+    columns, values, mask = invalid_mask(df, rules)
+    values[mask] = np.nan
+    for index, column in enumerate(columns):
+        df[column] = values[:, index]
+    return dict(zip(columns, mask.sum(axis=0).tolist()))
+
+
+def clean_strings(df, fills=STRING_FILLS):
+    """Strip string columns, fill missing values and store them as categoricals."""
+    for column, fill in fills.items():
+        if column in df:
+            df[column] = df[column].astype('string').str.strip().fillna(fill).astype('category')
+
+
+def resolve_names(df, key='mmsi', column='vessel_name', missing=None):
+    """Give every row the most frequent column value of its key.
+
+    Ties go to the smallest value, as with ``Series.mode()[0]``. missing is
+    the fill used for absent values (positions heard before the vessel's
+    first static message); it is not counted as a value, so those rows take
+    the key's name, and only keys without any name keep it. Returns the keys
+    that had more than one distinct value.
+
+    >>> df = pd.DataFrame({'mmsi': [1] * 5, 'vessel_name': ['Unknown'] * 3 + ['ALPHA'] * 2})
+    >>> resolve_names(df, missing='Unknown').tolist()
+    []
+    >>> df['vessel_name'].tolist()
+    ['ALPHA', 'ALPHA', 'ALPHA', 'ALPHA', 'ALPHA']
+    """
+    counts = df.groupby([key, column], observed=True, sort=False).size().reset_index(name='count')
+    counts[column] = counts[column].astype(str)
+    has_missing = False
+    if missing is not None:
+        known = counts[column] != missing
+        has_missing = not known.all()
+        counts = counts[known]
+    inconsistent = counts[key][counts[key].duplicated()].unique()
+    if len(inconsistent) == 0 and not has_missing:
+        return inconsistent
+
+    modes = (
+        counts.sort_values([key, 'count', column], ascending=[True, False, True], kind='stable')
+        .drop_duplicates(key)
+        .set_index(key)[column]
+    )
+    resolved = df[key].map(modes)
+    if missing is not None:
+        resolved = resolved.fillna(missing)
+    df[column] = resolved.astype('category')
+    return inconsistent
+
+
+def clean(df, rules=RULES, fills=STRING_FILLS):
+    """Run the cleaning steps in place; returns a stats dict.
+
+    Positions that arrive before their vessel's first static message keep
+    the vessel's name:
+
+    >>> df = pd.DataFrame({'mmsi': [1] * 5, 'vessel_name': [None, None, None, 'ALPHA', 'ALPHA']})
+    >>> clean(df)['inconsistent_mmsi']
+    []
+    >>> df['vessel_name'].tolist()
+    ['ALPHA', 'ALPHA', 'ALPHA', 'ALPHA', 'ALPHA']
+    """
+    stats = {'invalid': apply_rules(df, rules)}
+    clean_strings(df, fills)
+    stats['inconsistent_mmsi'] = []
+    if 'mmsi' in df and 'vessel_name' in df:
+        stats['inconsistent_mmsi'] = resolve_names(df, missing=fills.get('vessel_name')).tolist()
+    return stats
@@ -0,0 +1,227 @@
+"""Columnar batch decoding of NMEA lines.
+
+``decode_block`` decodes a block of NMEA lines straight into preallocated
+typed NumPy buffers, one set of columns per message group, and returns
+pandas DataFrames or pyarrow RecordBatches without building a dict per
+message.
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from fastdecode import COMPILED, COMPILED_CLASS_B_STATIC, decode_text, try_dearmor
+from reassembly import reassemble
+from timestamps import NAT, TimestampParser, to_datetime64
+
+# Group name -> (message types, columns); a column is
+# (name, layout key, dtype, fill value used when a type lacks the field)
+GROUPS = {
+    'position': (
+        (1, 2, 3, 18, 19, 27),
+        (
+            ('mmsi', 'mmsi', np.int32, 0),
+            ('lat', 'latitude', np.float32, np.nan),
+            ('lon', 'longitude', np.float32, np.nan),
+            ('sog', 'sog', np.float32, np.nan),
+            ('cog', 'cog', np.float32, np.nan),
+            ('heading', 'true_heading', np.uint16, 511),
+            ('nav_status', 'navigation_status', np.uint8, 15),
+            ('rot', 'rot', np.float32, np.nan),
+            ('position_accuracy', 'position_accuracy', np.uint8, 0),
+        ),
+    ),
+    'static': (
+        (5, 19, 24),
+        (
+            ('mmsi', 'mmsi', np.int32, 0),
+            ('part_number', 'part_number', np.int8, -1),
+            ('imo', 'imo_number', np.int32, 0),
+            ('ship_type', 'ship_type', np.uint8, 0),
+            ('vessel_name', 'vessel_name', object, None),
+            ('call_sign', 'call_sign', object, None),
+            ('destination', 'destination', object, None),
+            ('draught', 'draught', np.float32, np.nan),
+            ('dim_to_bow', 'dim_to_bow', np.uint16, 0),
+            ('dim_to_stern', 'dim_to_stern', np.uint16, 0),
+            ('dim_to_port', 'dim_to_port', np.uint8, 0),
+            ('dim_to_starboard', 'dim_to_starboard', np.uint8, 0),
+        ),
+    ),
+    'base_station': (
+        (4,),
+        (
+            ('mmsi', 'mmsi', np.int32, 0),
+            ('lat', 'latitude', np.float32, np.nan),
+            ('lon', 'longitude', np.float32, np.nan),
+            ('year', 'year', np.uint16, 0),
+            ('month', 'month', np.uint8, 0),
+            ('day', 'day', np.uint8, 0),
+            ('hour', 'hour', np.uint8, 24),
+            ('minute', 'minute', np.uint8, 60),
+            ('second', 'second', np.uint8, 60),
+        ),
+    ),
+    'aid_to_navigation': (
+        (21,),
+        (
+            ('mmsi', 'mmsi', np.int32, 0),
+            ('aid_type', 'aid_type', np.uint8, 0),
+            ('name', 'name', object, None),
+            ('lat', 'latitude', np.float32, np.nan),
+            ('lon', 'longitude', np.float32, np.nan),
+            ('off_position', 'off_position', np.uint8, 0),
+            ('virtual_aid', 'virtual_aid', np.uint8, 0),
+        ),
+    ),
+}
+
+
+def _column_extractors(compiled, columns):
+    """Pick the compiled fields of one layout that feed the group's columns."""
+    length, fields = compiled
+    by_key = {field[0]: field for field in fields}
+    extractors = []
+    for index, (_, key, _, _) in enumerate(columns):
+        field = by_key.get(key)
+        if field is not None:
+            extractors.append((index,) + field[1:])
+    return length, tuple(extractors)
+
+
+def _compile_groups():
+    """Map each message type (and type 24 part) to its groups' extractors."""
+    plans = {}
+    for group, (msg_types, columns) in GROUPS.items():
+        for msg_type in msg_types:
+            if msg_type == 24:
+                for part, compiled in COMPILED_CLASS_B_STATIC.items():
+                    plans.setdefault((24, part), []).append((group, _column_extractors(compiled, columns)))
+            else:
+                plans.setdefault((msg_type, None), []).append((group, _column_extractors(COMPILED[msg_type], columns)))
+    return plans
+
+
+PLANS = _compile_groups()
+
+
+class ColumnBuffers:
+    """Preallocated typed columns for one message group."""
+
+    def __init__(self, columns, capacity):
+        self.names = [name for name, _, _, _ in columns]
+        self.fills = [fill for _, _, _, fill in columns]
+        self.arrays = [np.full(capacity, fill, dtype=dtype) for _, _, dtype, fill in columns]
+        self.msg_type = np.zeros(capacity, dtype=np.uint8)
+        self.time = np.full(capacity, NAT, dtype=np.int64)  # Epoch seconds
+        self.size = 0
+
+    def columns(self):
+        """Return the filled part of every column keyed by name."""
+        n = self.size
+        result = {'msg_type': self.msg_type[:n]}
+        for name, array in zip(self.names, self.arrays):
+            result[name] = array[:n]
+        result['time'] = self.time[:n]
+        return result
+
+
+def _write_row(buffers, extractors, value, bit_count, msg_type, timestamp):
+    length, fields = extractors
+    if bit_count < length:
+        value <<= length - bit_count
+    elif bit_count > length:
+        value >>= bit_count - length
+
+    row = buffers.size
+    arrays = buffers.arrays
+    for index, shift, mask, width, kind, convert in fields:
+        raw = (value >> shift) & mask
+        if kind == 's':
+            arrays[index][row] = decode_text(raw, width)
+            continue
+        if kind == 'i' and raw >> (width - 1):
+            raw -= 1 << width
+        if convert:
+            raw = convert(raw)
+            if raw is None:
+                raw = buffers.fills[index]
+        arrays[index][row] = raw
+    buffers.msg_type[row] = msg_type
+    buffers.time[row] = timestamp
+    buffers.size = row + 1
+
+
+def decode_columns(lines, groups=None):
+    """Decode NMEA lines into {group: {column: array}}.
+
+    Multipart messages are reassembled first. Buffers are sized to the block,
+    so memory is bounded by the block length rather than by per-message
+    objects. Messages that are not !AIVDM, have an empty payload or a type
+    without a group are skipped.
+    """
+    groups = groups or list(GROUPS)
+    capacity = len(lines)
+    buffers = {group: ColumnBuffers(GROUPS[group][1], capacity) for group in groups}
+    parse_time = TimestampParser().parse
+
+    for message in reassemble(lines):
+        payload = message.payload
+        if not payload or not message.sentences[0].startswith('!AIVDM'):
+            continue
+        dearmored = try_dearmor(payload)
+        if dearmored is None:
+            continue
+        value, bit_count = dearmored
+        msg_type = value >> (bit_count - 6)
+
+        part = None
+        if msg_type == 24:
+            part = (value >> (bit_count - 40)) & 0x3 if bit_count >= 40 else 0
+        plan = PLANS.get((msg_type, part))
+        if plan is None:
+            continue
+
+        timestamp = parse_time(message.timestamp)
+        if timestamp is None:
+            timestamp = NAT
+        for group, extractors in plan:
+            if group in buffers:
+                _write_row(buffers[group], extractors, value, bit_count, msg_type, timestamp)
+
+    return {group: buffer.columns() for group, buffer in buffers.items()}
+
+
+def to_dataframes(columns):
+    """Wrap decoded columns in pandas DataFrames."""
+    frames = {}
+    for group, cols in columns.items():
+        cols = dict(cols, time=to_datetime64(cols['time']))
+        frames[group] = pd.DataFrame(cols, copy=False)
+    return frames
+
+
+def to_record_batches(columns):
+    """Wrap decoded columns in pyarrow RecordBatches."""
+    batches = {}
+    for group, cols in columns.items():
+        arrays = []
+        for name, values in cols.items():
+            if name == 'time':
+                arrays.append(pa.array(values, type=pa.timestamp('s'), mask=values == NAT))
+            elif values.dtype == object:
+                arrays.append(pa.array(values, type=pa.string()))
+            elif values.dtype.kind == 'f':
+                arrays.append(pa.array(values, mask=np.isnan(values)))
+            else:
+                arrays.append(pa.array(values))
+        batches[group] = pa.RecordBatch.from_arrays(arrays, names=list(cols))
+    return batches
+
+
+def decode_block(lines, output='pandas', groups=None):
+    """Decode a block of NMEA lines into DataFrames or RecordBatches per group."""
+    columns = decode_columns(lines, groups)
+    if output == 'arrow':
+        return to_record_batches(columns)
+    return to_dataframes(columns)
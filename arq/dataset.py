@@ -0,0 +1,229 @@
+"""Hive-partitioned Parquet datasets of decoded messages.
+
+``PartitionedSink`` writes decoded rows as ``root/date=YYYY-MM-DD/msg_type=N/``
+directories. Rows are buffered and sorted by MMSI (then time) before each
+write, so every row group covers a narrow MMSI range and its min/max
+statistics let readers skip it. ``read_table`` reads a dataset (or a single
+Parquet file) through ``pyarrow.dataset`` with filter and column pushdown:
+partitions that cannot match are never opened and row groups whose MMSI
+statistics exclude the filter are never read. ``LazyDataset`` is a handle
+that reads columns only when a caller first asks for them.
+"""
+
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from parquet_sink import to_table
+
+PARTITION_SCHEMA = pa.schema([('date', pa.string()), ('msg_type', pa.int16())])
+
+
+class PartitionedSink:
+    """Write rows, DataFrames or Arrow data to a Hive-partitioned dataset.
+
+    Same interface as ParquetSink. The schema must contain msg_type, mmsi
+    and the time column; the date partition is derived from the time
+    column. An existing dataset at root is replaced.
+    """
+
+    def __init__(self, root, schema, time_column='timestamp', batch_rows=1000000,
+                 row_group_size=100000, compression='snappy'):
+        self.root = root
+        self.schema = schema
+        self.time_column = time_column
+        self.batch_rows = batch_rows
+        self.row_group_size = row_group_size
+        self.file_options = ds.ParquetFileFormat().make_write_options(compression=compression)
+        self.token = uuid.uuid4().hex[:8]  # Keeps file names unique across sinks
+        self.batches_written = 0
+        self.pending = []
+        self.pending_rows = 0
+        self.rows_written = 0
+        if os.path.isdir(root):
+            shutil.rmtree(root)
+
+    def write(self, data):
+        """Buffer data; a sorted batch is written once batch_rows are pending."""
+        table = to_table(data, self.schema)
+        if table.num_rows == 0:
+            return
+        self.pending.append(table)
+        self.pending_rows += table.num_rows
+        if self.pending_rows >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        """Sort and write everything buffered."""
+        if not self.pending:
+            return
+        table = pa.concat_tables(self.pending)
+        self.pending = []
+        self.pending_rows = 0
+
+        date = pc.strftime(table[self.time_column], format='%Y-%m-%d')
+        table = table.append_column('date', date)
+        table = table.sort_by([
+            ('date', 'ascending'),
+            ('msg_type', 'ascending'),
+            ('mmsi', 'ascending'),
+            (self.time_column, 'ascending'),
+        ])
+        ds.write_dataset(
+            table,
+            self.root,
+            format='parquet',
+            partitioning=ds.partitioning(PARTITION_SCHEMA, flavor='hive'),
+            basename_template=f"part-{self.token}-{self.batches_written}-{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore',
+            file_options=self.file_options,
+            max_rows_per_group=self.row_group_size,
+            min_rows_per_group=min(self.row_group_size, table.num_rows),
+        )
+        self.batches_written += 1
+        self.rows_written += table.num_rows
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_dataset(path):
+    """Open a partitioned dataset directory or a single Parquet file."""
+    if os.path.isdir(path):
+        return ds.dataset(path, format='parquet', partitioning='hive')
+    return ds.dataset(path, format='parquet')
+
+
+def build_filter(dataset, mmsi=None, msg_type=None, match_any=False):
+    """Combine the given equality filters into a dataset expression (or None).
+
+    Conditions are ANDed, or ORed with match_any. Filters on columns the
+    dataset does not have are left out.
+    """
+    names = dataset.schema.names
+    expression = None
+    for column, value in (('mmsi', mmsi), ('msg_type', msg_type)):
+        if value is None or column not in names:
+            continue
+        condition = ds.field(column) == value
+        if expression is None:
+            expression = condition
+        else:
+            expression = expression | condition if match_any else expression & condition
+    return expression
+
+
+def read_table(path, columns=None, filter=None):
+    """Read the matching rows and columns of a dataset or file as a Table.
+
+    filter is a pyarrow.dataset expression or None; columns missing from the
+    dataset are ignored.
+    """
+    dataset = open_dataset(path)
+    if columns is not None:
+        columns = [name for name in columns if name in dataset.schema.names]
+    return dataset.to_table(columns=columns, filter=filter)
+
+
+class LazyDataset:
+    """A dataset or Parquet file whose columns are read on first use.
+
+    Opening reads only the schema. ``load`` reads just the requested columns
+    that are not cached yet, so commands run one after another (as in the
+    explorer's interactive mode) never read a column twice. The row filter
+    is fixed when the handle is opened, which keeps cached columns aligned.
+    """
+
+    def __init__(self, path, filter=None):
+        self.path = path
+        self.dataset = open_dataset(path)
+        self.filter = filter
+        self.cache = {}  # column name -> pandas Series
+        self._num_rows = None
+
+    @property
+    def columns(self):
+        return self.dataset.schema.names
+
+    @property
+    def num_rows(self):
+        if self._num_rows is None:
+            # Answered from file metadata when there is no filter
+            self._num_rows = self.dataset.count_rows(filter=self.filter)
+        return self._num_rows
+
+    @property
+    def dtypes(self):
+        """pandas dtypes of all columns, derived from the schema alone."""
+        return self.dataset.schema.empty_table().to_pandas().dtypes
+
+    def load(self, columns=None):
+        """Return a DataFrame of the given columns (all when None).
+
+        Columns the dataset does not have are skipped.
+        """
+        if columns is None:
+            columns = self.columns
+        columns = [name for name in dict.fromkeys(columns) if name in self.columns]
+        missing = [name for name in columns if name not in self.cache]
+        if missing:
+            df = self.dataset.to_table(columns=missing, filter=self.filter).to_pandas()
+            for name in missing:
+                self.cache[name] = df[name]
+            self._num_rows = len(df)
+        if not columns:
+            return pd.DataFrame(index=pd.RangeIndex(self.num_rows))
+        return pd.DataFrame({name: self.cache[name] for name in columns})
+
+    def head(self, n=5):
+        """First n rows, reading only as many batches as needed."""
+        if self.filter is None:
+            return self.dataset.head(n).to_pandas()
+        return self.load().head(n)
+
+    def tail(self, n=5):
+        """Last n rows."""
+        if self.filter is None:
+            start = max(self.num_rows - n, 0)
+            df = self.dataset.take(np.arange(start, self.num_rows)).to_pandas()
+            df.index = pd.RangeIndex(start, self.num_rows)
+            return df
+        return self.load().tail(n)
+
+    def null_counts(self):
+        """Null count per column, from row group statistics where possible."""
+        if self.filter is not None:
+            return self.load().isna().sum()
+        counts = dict.fromkeys(self.columns, 0)
+        unknown = set()
+        for fragment in self.dataset.get_fragments():
+            metadata = fragment.metadata
+            for name in self.columns:
+                if name in unknown:
+                    continue
+                index = metadata.schema.names.index(name) if name in metadata.schema.names else None
+                if index is None:
+                    unknown.add(name)  # Partition column
+                    continue
+                for group in range(metadata.num_row_groups):
+                    statistics = metadata.row_group(group).column(index).statistics
+                    if statistics is None or not statistics.has_null_count:
+                        unknown.add(name)
+                        break
+                    counts[name] += statistics.null_count
+        if unknown:
+            nulls = self.load([name for name in self.columns if name in unknown]).isna().sum()
+            counts.update(nulls.to_dict())
+        return pd.Series(counts)
@@ -2,39 +2,46 @@ import re
 import math
 from datetime import datetime
 from bitstring import BitArray
+from fastdecode import (
+    decode_rot,
+    decode_lon,
+    decode_lat,
+    decode_long_range_lon,
+    decode_long_range_lat,
+)
+from prefilter import Prefilter
+from records import try_decode_record
+from reassembly import Reassembler, raw_line
+from linereader import read_lines
+from vessels import VesselTable
 
-def decode_ais(ais_messages):
+def decode_ais(ais_messages, prefilter=None):
+    # Accept either the whole log as one string or an iterable of lines
+    if isinstance(ais_messages, str):
+        ais_messages = ais_messages.strip().split('\n')
+    # Lines with bad checksums, empty payloads or missing fields are dropped
+    # before reassembly and never reach the decoder
+    prefilter = prefilter or Prefilter()
     results = []
-    for message in ais_messages.strip().split('\n'):
-        try:
-            parts = message.split(',')
-            if len(parts) < 6 or not parts[0].startswith('!AIVDM'):
-                continue
-                
-            # Extract relevant parts
-            fragment_count = int(parts[1])
-            fragment_number = int(parts[2])
-            msg_id = parts[3]
-            channel = parts[4]
-            payload = parts[5]
-            timestamp = parts[7] if len(parts) > 7 else None
-            
-            # Skip multipart messages for simplicity
-            if fragment_count > 1:
-                continue
-                
-            # Decode the payload
-            decoded = decode_payload(payload)
-            if decoded:
-                if timestamp:
-                    decoded['timestamp'] = timestamp
-                results.append(decoded)
-        except Exception as e:
-            print(f"Error decoding message: {message}\nError: {e}")
-            
+    reassembler = Reassembler()
+    for message in reassembler.process(prefilter.filter(ais_messages)):
+        if not message.sentences[0].startswith('!AIVDM'):
+            continue
+
+        # Decode the (reassembled) payload into a compact record; bad payloads
+        # come back as a status, not an exception
+        status, decoded, error = try_decode_record(message.payload)
+        if decoded is None:
+            print(f"Error decoding message: {raw_line(message)}\nError: {error}")
+            continue
+        if message.timestamp:
+            decoded['timestamp'] = message.timestamp
+        results.append(decoded)
+
     return results
 
-def decode_payload(payload):
+# Reference BitArray implementation, kept for benchmarking against fastdecode
+def decode_payload_bitarray(payload):
     # Convert the 6-bit ASCII to binary
     binary = ''
     for c in payload:
@@ -230,36 +237,6 @@ def decode_long_range_position(bits):
     return result
 
 # Helper functions
-def decode_rot(rot_raw):
-    if rot_raw == -128:
-        return None  # Not available
-    if rot_raw == 0:
-        return 0  # Not turning
-        
-    sign = 1 if rot_raw > 0 else -1
-    rot_abs = abs(rot_raw)
-    return sign * (rot_abs / 4.733) ** 2
-
-def decode_lon(lon_raw):
-    if lon_raw == 0x6791AC0:  # 181 degrees = not available
-        return None
-    return lon_raw / 600000.0
-
-def decode_lat(lat_raw):
-    if lat_raw == 0x3412140:  # 91 degrees = not available
-        return None
-    return lat_raw / 600000.0
-
-def decode_long_range_lon(lon_raw):
-    if lon_raw == 0x181:  # 181 degrees = not available
-        return None
-    return lon_raw / 10.0
-
-def decode_long_range_lat(lat_raw):
-    if lat_raw == 0x91:  # 91 degrees = not available
-        return None
-    return lat_raw / 10.0
-
 def decode_string(bits):
     result = ""
     for i in range(0, len(bits), 6):
@@ -298,76 +275,15 @@ def get_navigation_status(status_code):
     }
     return statuses.get(status_code, "Unknown")
 
-# Helper to get vessel type as text
-def get_vessel_type(type_code):
-    if 20 <= type_code <= 29:
-        return f"Wing in ground (WIG) - {type_code}"
-    elif 30 <= type_code <= 39:
-        return f"Fishing - {type_code}"
-    elif 40 <= type_code <= 49:
-        return f"Tug - {type_code}"
-    elif 50 <= type_code <= 59:
-        return f"Dredger - {type_code}"
-    elif 60 <= type_code <= 69:
-        return f"Passenger - {type_code}"
-    elif 70 <= type_code <= 79:
-        return f"Cargo - {type_code}"
-    elif 80 <= type_code <= 89:
-        return f"Tanker - {type_code}"
-    elif 90 <= type_code <= 99:
-        return f"Other - {type_code}"
-    else:
-        return f"Unknown - {type_code}"
-
-# Main function to process the file
+# Main function to process the file (a string or an iterable of lines)
 def process_ais_file(file_content):
     # Decode all messages
     decoded_messages = decode_ais(file_content)
     
-    # Group by MMSI to track vessels
-    vessels = {}
-    for msg in decoded_messages:
-        if 'mmsi' in msg:
-            mmsi = msg['mmsi']
-            if mmsi not in vessels:
-                vessels[mmsi] = []
-            vessels[mmsi].append(msg)
-    
-    # Create a summary
-    summary = []
-    for mmsi, messages in vessels.items():
-        vessel_info = {
-            'mmsi': mmsi,
-            'message_count': len(messages)
-        }
-        
-        # Try to get vessel name
-        for msg in messages:
-            if 'vessel_name' in msg and msg['vessel_name']:
-                vessel_info['name'] = msg['vessel_name']
-                break
-        
-        # Get latest position
-        position_msgs = [msg for msg in messages if 'latitude' in msg and msg['latitude'] is not None]
-        if position_msgs:
-            latest_pos = position_msgs[-1]
-            vessel_info.update({
-                'latitude': latest_pos['latitude'],
-                'longitude': latest_pos['longitude']
-            })
-            
-            if 'sog' in latest_pos:
-                vessel_info['speed'] = latest_pos['sog']
-            if 'cog' in latest_pos:
-                vessel_info['course'] = latest_pos['cog']
-        
-        # Get vessel type if available
-        for msg in messages:
-            if 'ship_type' in msg:
-                vessel_info['type'] = get_vessel_type(msg['ship_type'])
-                break
-        
-        summary.append(vessel_info)
+    # Track vessels incrementally, one O(1) update per message
+    vessels = VesselTable()
+    vessels.update_many(decoded_messages)
+    summary = [state.summary() for state in vessels]
     
     return {
         'total_messages': len(decoded_messages),
@@ -381,11 +297,11 @@ if __name__ == "__main__":
     import sys
     
     if len(sys.argv) > 1:
-        with open(sys.argv[1], 'r') as f:
-            ais_data = f.read()
+        # Stream the file instead of reading it into memory
+        ais_data = read_lines(sys.argv[1])
     else:
         # Read from stdin
-        ais_data = sys.stdin.read()
+        ais_data = sys.stdin
     
     results = process_ais_file(ais_data)
     
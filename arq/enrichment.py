@@ -0,0 +1,86 @@
+"""Time-aware enrichment of position reports with static vessel data.
+
+Each position is given the latest static values (vessel name, call sign)
+known for its MMSI at or before its timestamp, so the output has exactly
+one row per position. ``attach_static`` does this for whole DataFrames with
+``pd.merge_asof``; ``StaticState`` keeps one record per MMSI for streams
+processed in arrival order.
+"""
+
+import numpy as np
+import pandas as pd
+
+STATIC_COLUMNS = ('vessel_name', 'call_sign')
+
+
+def _known(values):
+    """Mask of values that carry information (not null, not blank)."""
+    known = values.notna().to_numpy().copy()
+    strings = values[known].astype(str).str.strip() != ''
+    known[known] = strings.to_numpy()
+    return known
+
+
+def attach_static(positions, statics, columns=STATIC_COLUMNS, key='mmsi', time='time', direction='backward'):
+    """Return positions with static columns resolved as of each row's time.
+
+    Every column is looked up separately among the static rows where it is
+    known, so a type 24 part B (call sign only) does not hide the name from
+    the preceding part A. Rows without a match or without a time get None.
+    Row count and order of positions are preserved.
+    """
+    times = positions[time]
+    has_time = times.notna().to_numpy()
+    left = pd.DataFrame({
+        time: times[has_time].to_numpy(),
+        key: positions[key][has_time].to_numpy(dtype=np.int64),
+        '_row': np.flatnonzero(has_time),
+    }).sort_values(time, kind='stable')
+
+    resolved = {}
+    for column in columns:
+        values = np.full(len(positions), None, dtype=object)
+        if column in statics and len(left):
+            known = statics[_known(statics[column])]
+            right = pd.DataFrame({
+                time: known[time].to_numpy(),
+                key: known[key].to_numpy(dtype=np.int64),
+                column: known[column].to_numpy(),
+            })
+            right = right[right[time].notna()].sort_values(time, kind='stable')
+            merged = pd.merge_asof(left, right, on=time, by=key, direction=direction)
+            matched = merged[column].notna().to_numpy()
+            values[merged['_row'].to_numpy()[matched]] = merged[column].to_numpy()[matched]
+        resolved[column] = values
+    return positions.assign(**resolved)
+
+
+class StaticState:
+    """Latest known static values per MMSI for enriching a stream in order.
+
+    Memory is one small record per vessel regardless of stream length.
+    """
+
+    def __init__(self, columns=STATIC_COLUMNS):
+        self.columns = tuple(columns)
+        self.vessels = {}  # mmsi -> [value per column]
+
+    def update(self, mmsi, **fields):
+        """Record the known (non-empty) values of a static message."""
+        record = self.vessels.get(mmsi)
+        if record is None:
+            record = self.vessels[mmsi] = [None] * len(self.columns)
+        for index, column in enumerate(self.columns):
+            value = fields.get(column)
+            if value is not None and value != '':
+                record[index] = value
+
+    def lookup(self, mmsi):
+        """Return {column: latest value or None} for an MMSI."""
+        record = self.vessels.get(mmsi)
+        if record is None:
+            return dict.fromkeys(self.columns)
+        return dict(zip(self.columns, record))
+
+    def __len__(self):
+        return len(self.vessels)
@@ -0,0 +1,220 @@
+"""Error accounting for decode loops.
+
+Failed messages are classified into a few categories and counted per
+category and message type, which costs a dict update per error. Only a
+sample of them is kept for inspection: the first ``keep_first`` of every
+category, then one in ``sample_every``, and never more than
+``max_per_second`` in total. Samples are buffered and written in batches to
+a JSONL or Parquet file. ``print_summary`` reports the counts once at the
+end, instead of a log line and a console line per failure.
+"""
+
+import json
+import time
+from collections import Counter
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from fastdecode import COMPILED, COMPILED_CLASS_B_STATIC, message_type, required_bits, try_dearmor
+from reassembly import split_sentence
+
+EMPTY_PAYLOAD = 'empty_payload'
+BAD_CHECKSUM = 'bad_checksum'
+ORPHAN_FRAGMENT = 'orphan_fragment'
+UNSUPPORTED_TYPE = 'unsupported_type'
+BIT_LENGTH = 'bit_length'
+MALFORMED = 'malformed'
+
+CATEGORIES = (EMPTY_PAYLOAD, BAD_CHECKSUM, ORPHAN_FRAGMENT, UNSUPPORTED_TYPE, BIT_LENGTH, MALFORMED)
+
+# pyais exception class names -> category
+PYAIS_CATEGORIES = {
+    'MissingPayloadException': EMPTY_PAYLOAD,
+    'MissingMultipartMessageException': ORPHAN_FRAGMENT,
+    'TooManyMessagesException': ORPHAN_FRAGMENT,
+    'UnknownPartNoException': ORPHAN_FRAGMENT,
+    'UnknownMessageException': UNSUPPORTED_TYPE,
+    'InvalidDataTypeException': BIT_LENGTH,
+}
+
+PART_NUMBER_BITS = 40  # Type 24 header up to the part number
+
+# Bits needed to reach the last field decoded for each message type; type 24
+# maps its part numbers to their own minimum
+MIN_BITS = {msg_type: required_bits(compiled) for msg_type, compiled in COMPILED.items()}
+MIN_BITS[24] = {part: required_bits(compiled) for part, compiled in COMPILED_CLASS_B_STATIC.items()}
+
+SAMPLE_SCHEMA = pa.schema([
+    ('category', pa.string()),
+    ('msg_type', pa.int16()),
+    ('error', pa.string()),
+    ('raw', pa.string()),
+    ('timestamp', pa.string()),
+])
+
+
+def _text(raw):
+    if isinstance(raw, (bytes, bytearray, memoryview)):
+        return bytes(raw).decode('ascii', 'replace')
+    return raw
+
+
+def payload_of(raw):
+    """Armored payload field of a single-sentence log line ('' if missing)."""
+    fields, _ = split_sentence(_text(raw))
+    return fields[5] if len(fields) > 5 else ''
+
+
+def check_bit_length(payload, fill_bits=0, min_bits=MIN_BITS):
+    """Error text when payload is too short for its message type, else None.
+
+    min_bits has the shape of MIN_BITS; pass the minimums of the fields a
+    caller actually decodes (e.g. Projection.min_bits).
+    """
+    if not payload:
+        return None
+    msg_type = message_type(payload)
+    needed = min_bits.get(msg_type)
+    bits = 6 * len(payload) - int(fill_bits or 0)
+    if isinstance(needed, dict):
+        dearmored = try_dearmor(payload[:-(-PART_NUMBER_BITS // 6)])
+        if dearmored is None:
+            return None  # Left to the decoder to report
+        value, header_bits = dearmored
+        if header_bits < PART_NUMBER_BITS:
+            needed = PART_NUMBER_BITS
+        else:
+            part = (value >> (header_bits - PART_NUMBER_BITS)) & 0x3
+            needed = needed.get(part)
+    if needed is not None and bits < needed:
+        return f"{bits} bits, type {msg_type} needs {needed}"
+    return None
+
+
+def classify(error, raw=None):
+    """Category for an exception raised while decoding raw."""
+    category = PYAIS_CATEGORIES.get(type(error).__name__)
+    if category is not None:
+        return category
+    if raw is not None and not payload_of(raw):
+        return EMPTY_PAYLOAD
+    if isinstance(error, (IndexError, OverflowError)):
+        return BIT_LENGTH
+    return MALFORMED
+
+
+class ErrorSink:
+    """Buffered writer for error samples; JSONL or Parquet by file extension."""
+
+    def __init__(self, path, buffer_size=1000):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.parquet = path.endswith('.parquet')
+        self.buffer = []
+        self.writer = None
+        self.rows_written = 0
+        if not self.parquet:
+            open(path, 'w').close()  # Start a fresh file for this run
+
+    def write(self, sample):
+        self.buffer.append(sample)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        if self.parquet:
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.path, SAMPLE_SCHEMA)
+            self.writer.write_table(pa.Table.from_pylist(self.buffer, schema=SAMPLE_SCHEMA))
+        else:
+            with open(self.path, 'a') as f:
+                f.writelines(json.dumps(sample) + '\n' for sample in self.buffer)
+        self.rows_written += len(self.buffer)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+class ErrorAccounting:
+    """Count errors by category and message type; keep a sample of them."""
+
+    def __init__(self, sink=None, keep_first=20, sample_every=100, max_per_second=200):
+        self.sink = sink
+        self.keep_first = keep_first
+        self.sample_every = sample_every
+        self.max_per_second = max_per_second
+        self.counts = Counter()  # category -> errors
+        self.by_type = Counter()  # (category, msg_type) -> errors
+        self.sampled = Counter()  # category -> samples written
+        self.window = 0  # Wall-clock second of the rate limit window
+        self.window_samples = 0
+
+    def record(self, category, raw=None, error=None, msg_type=None):
+        """Count one failed message and maybe keep it as a sample."""
+        count = self.counts[category] = self.counts[category] + 1
+        if msg_type is None and raw is not None:
+            payload = payload_of(raw)
+            if payload:
+                msg_type = message_type(payload)
+        self.by_type[category, msg_type] += 1
+
+        if self.sink is None:
+            return
+        if count > self.keep_first and (count - self.keep_first) % self.sample_every:
+            return
+        now = int(time.monotonic())
+        if now != self.window:
+            self.window = now
+            self.window_samples = 0
+        if self.window_samples >= self.max_per_second:
+            return
+        self.window_samples += 1
+        self.sampled[category] += 1
+
+        raw = _text(raw)
+        self.sink.write({
+            'category': category,
+            'msg_type': msg_type,
+            'error': str(error) if error is not None else None,
+            'raw': raw,
+            'timestamp': split_sentence(raw)[1] if raw else None,
+        })
+
+    def record_exception(self, error, raw=None, msg_type=None):
+        """Classify and record an exception raised while decoding raw."""
+        category = classify(error, raw)
+        self.record(category, raw, error, msg_type)
+        return category
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def close(self):
+        if self.sink is not None:
+            self.sink.close()
+
+    def summary(self):
+        """Lines describing the counts per category and message type."""
+        lines = [f"Messages with errors: {self.total}"]
+        for category, count in self.counts.most_common():
+            types = sorted(
+                (msg_type, n) for (name, msg_type), n in self.by_type.items()
+                if name == category and msg_type is not None
+            )
+            detail = ', '.join(f"type {msg_type}: {n}" for msg_type, n in types)
+            lines.append(f"  {category}: {count}" + (f" ({detail})" if detail else ""))
+        if self.sink is not None and self.sampled:
+            lines.append(f"Error samples written to {self.sink.path}: {sum(self.sampled.values())}")
+        return lines
+
+    def print_summary(self):
+        for line in self.summary():
+            print(line)
@@ -4,15 +4,53 @@ import matplotlib.pyplot as plt
 import os
 import sys
 
-def load_parquet(filename):
-    """Load the parquet file and return a DataFrame."""
+import dataset
+import spatial
+import tracks
+from timestamps import TimestampParser
+
+# Columns read for each command. Names used by the different outputs are
+# listed together; whichever the file has are loaded.
+COMMAND_COLUMNS = {
+    'stats': ['mmsi', 'type_code', 'latitude', 'name'],
+    'list': ['mmsi', 'name'],
+    'mmsi': ['mmsi', 'name', 'type', 'latitude', 'longitude', 'speed', 'course'],
+    'type': ['mmsi', 'msg_type', 'lat', 'lon', 'speed', 'vessel_name', 'ship_type'],
+    'plot': ['mmsi', 'name', 'vessel_name'] + [name for pair in spatial.COORDINATE_COLUMNS for name in pair] + spatial.TIME_COLUMNS,
+    'spatial': ['mmsi'] + [name for pair in spatial.COORDINATE_COLUMNS for name in pair] + spatial.TIME_COLUMNS,
+}
+
+DEFAULT_TRACK_POINTS = 2000
+
+# Prepared tracks, reused when the same vessel is plotted again
+track_cache = tracks.TrackCache()
+
+def open_parquet(filename, mmsi=None, msg_type=None):
+    """Open a Parquet file or partitioned dataset directory without reading it.
+
+    Columns are read by load_columns as commands need them. mmsi and
+    msg_type are pushed down to the reader, so only partitions and row
+    groups that can contain matching rows are read.
+    """
     if not os.path.exists(filename):
         print(f"Error: File {filename} not found.")
         sys.exit(1)
     
     try:
-        df = pd.read_parquet(filename)
-        return df
+        data = dataset.LazyDataset(filename)
+        # --mmsi and --type are separate commands, so keep rows matching either
+        row_filter = dataset.build_filter(data.dataset, mmsi, msg_type, match_any=True)
+        if row_filter is not None:
+            data = dataset.LazyDataset(filename, row_filter)
+        return data
+    except Exception as e:
+        print(f"Error loading parquet file: {e}")
+        sys.exit(1)
+
+def load_columns(data, command):
+    """DataFrame with the columns a command needs (cached in data)."""
+    try:
+        return data.load(COMMAND_COLUMNS[command])
     except Exception as e:
         print(f"Error loading parquet file: {e}")
         sys.exit(1)
@@ -107,33 +145,33 @@ def filter_by_msg_type(df, msg_type):
     
     return filtered
 
-def plot_vessel_track(df, mmsi, save_path=None):
-    """Plot vessel track on a map."""
-    # Update to use latitude/longitude instead of lat/lon
-    position_data = df[(df['mmsi'] == mmsi) & df['latitude'].notnull() & df['longitude'].notnull()]
+def plot_vessel_track(df, mmsi, save_path=None, max_points=DEFAULT_TRACK_POINTS, tolerance=None,
+                      resample_seconds=None, method='douglas-peucker'):
+    """Plot vessel track on a map, simplified to at most max_points positions."""
+    track = track_cache.get(df, mmsi, resample_seconds, method)
+    position_data = track.simplified(max_points, tolerance)
     
     if len(position_data) == 0:
         print(f"No position data available for MMSI {mmsi}")
         return
+    print(f"Plotting {len(position_data)} of {len(track.positions)} positions")
         
     title = f"Track for MMSI {mmsi}"
     
     plt.figure(figsize=(10, 8))
     
     vessel_name = "Unknown"
-    # Update to use name instead of vessel_name
-    vessel_data = df[(df['mmsi'] == mmsi) & (df['name'].notnull()) & (df['name'] != 'N/A')]
-    if len(vessel_data) > 0:
-        vessel_name = vessel_data.iloc[0]['name']
-            
-    # Sort by timestamp if available
-    if 'last_updated' in position_data.columns and position_data['last_updated'].nunique() > 1:
-        position_data = position_data.sort_values('last_updated')
+    # Vessel summaries call it name, decoded messages vessel_name
+    name_column = 'name' if 'name' in df.columns else 'vessel_name'
+    if name_column in df.columns:
+        vessel_data = df[(df['mmsi'] == mmsi) & (df[name_column].notnull()) & (df[name_column] != 'N/A')]
+        if len(vessel_data) > 0:
+            vessel_name = vessel_data.iloc[0][name_column]
             
-    # Update to use longitude/latitude
-    plt.plot(position_data['longitude'], position_data['latitude'], '-', label=f"{mmsi} ({vessel_name})")
-    plt.plot(position_data['longitude'].iloc[0], position_data['latitude'].iloc[0], 'go', markersize=8)  # Start point
-    plt.plot(position_data['longitude'].iloc[-1], position_data['latitude'].iloc[-1], 'ro', markersize=8)  # End point
+    # Positions are in time order
+    plt.plot(position_data['lon'], position_data['lat'], '-', label=f"{mmsi} ({vessel_name})")
+    plt.plot(position_data['lon'].iloc[0], position_data['lat'].iloc[0], 'go', markersize=8)  # Start point
+    plt.plot(position_data['lon'].iloc[-1], position_data['lat'].iloc[-1], 'ro', markersize=8)  # End point
     
     plt.title(title)
     plt.xlabel('Longitude')
@@ -142,10 +180,10 @@ def plot_vessel_track(df, mmsi, save_path=None):
     plt.legend()
         
     # Adjust plot limits to add a margin around the data
-    x_margin = (position_data['longitude'].max() - position_data['longitude'].min()) * 0.05
-    y_margin = (position_data['latitude'].max() - position_data['latitude'].min()) * 0.05
-    plt.xlim([position_data['longitude'].min() - x_margin, position_data['longitude'].max() + x_margin])
-    plt.ylim([position_data['latitude'].min() - y_margin, position_data['latitude'].max() + y_margin])
+    x_margin = (position_data['lon'].max() - position_data['lon'].min()) * 0.05
+    y_margin = (position_data['lat'].max() - position_data['lat'].min()) * 0.05
+    plt.xlim([position_data['lon'].min() - x_margin, position_data['lon'].max() + x_margin])
+    plt.ylim([position_data['lat'].min() - y_margin, position_data['lat'].max() + y_margin])
     
     if save_path:
         plt.savefig(save_path)
@@ -177,8 +215,40 @@ def list_vessels_with_names(df):
             print(f"... and {len(vessels) - 50} more vessels")
             break
 
-def interactive_explore(df):
-    """Interactive exploration mode."""
+def parse_time_arg(text):
+    """Epoch seconds for a 'YYYY-MM-DD HH:MM:SS' argument, None if not given."""
+    if text is None:
+        return None
+    value = TimestampParser().parse(text)
+    if value is None:
+        print(f"Invalid time '{text}', expected YYYY-MM-DD HH:MM:SS")
+        sys.exit(1)
+    return value
+
+def query_bbox(df, index, bbox, start=None, end=None):
+    """Show positions inside a lat/lon box, optionally within a time window."""
+    min_lat, min_lon, max_lat, max_lon = bbox
+    rows = index.bbox(min_lat, min_lon, max_lat, max_lon, start, end)
+    rows.sort()  # Back to file order
+    result = df.iloc[rows]
+    print(f"\n=== Positions in box {min_lat}, {min_lon} to {max_lat}, {max_lon} ===")
+    print(f"Records: {len(result)}")
+    if len(result) > 0:
+        print(f"Unique vessels: {result['mmsi'].nunique()}")
+        print(result.head(20))
+    return result
+
+def query_near(df, index, lat, lon, radius_nm, start=None, end=None):
+    """Show vessels within radius_nm of a point, closest first."""
+    result = spatial.vessels_near(df, index, lat, lon, radius_nm, start, end)
+    print(f"\n=== Vessels within {radius_nm} nm of {lat}, {lon} ===")
+    print(f"Vessels: {len(result)}")
+    for _, row in result.head(50).iterrows():
+        print(f"  MMSI: {row['mmsi']}, Distance: {row['distance_nm']:.1f} nm")
+    return result
+
+def interactive_explore(data):
+    """Interactive exploration mode; columns stay cached between commands."""
     while True:
         print("\n=== AIS Data Explorer ===")
         print("1. Show basic statistics")
@@ -191,20 +261,20 @@ def interactive_explore(df):
         choice = input("\nEnter choice (1-6): ")
         
         if choice == '1':
-            show_basic_stats(df)
+            show_basic_stats(load_columns(data, 'stats'))
         elif choice == '2':
-            list_vessels_with_names(df)
+            list_vessels_with_names(load_columns(data, 'list'))
         elif choice == '3':
             try:
                 mmsi = int(input("Enter MMSI number: "))
-                filtered = filter_by_mmsi(df, mmsi)
+                filtered = filter_by_mmsi(load_columns(data, 'mmsi'), mmsi)
             except ValueError:
                 print("Invalid MMSI. Please enter a valid number.")
         elif choice == '4':
             try:
                 msg_type = int(input("Enter message type (1-27): "))
                 if 1 <= msg_type <= 27:
-                    filtered = filter_by_msg_type(df, msg_type)
+                    filtered = filter_by_msg_type(load_columns(data, 'type'), msg_type)
                 else:
                     print("Invalid message type. Please enter a number between 1 and 27.")
             except ValueError:
@@ -214,7 +284,7 @@ def interactive_explore(df):
                 mmsi = int(input("Enter MMSI number: "))
                 save_path = input("Save plot to file (leave empty to display): ")
                 save_path = save_path if save_path.strip() else None
-                plot_vessel_track(df, mmsi, save_path)
+                plot_vessel_track(load_columns(data, 'plot'), mmsi, save_path)
             except ValueError:
                 print("Invalid MMSI. Please enter a valid number.")
         elif choice == '6':
@@ -225,46 +295,77 @@ def interactive_explore(df):
 
 def main():
     parser = argparse.ArgumentParser(description='Explore AIS data from Parquet file')
-    parser.add_argument('--file', '-f', default='decoded_ais_data.parquet', help='Parquet file to explore')
+    parser.add_argument('--file', '-f', default='decoded_ais_data', help='Parquet file or dataset directory to explore')
     parser.add_argument('--stats', '-s', action='store_true', help='Show basic statistics')
     parser.add_argument('--mmsi', '-m', type=int, help='Filter by MMSI number')
     parser.add_argument('--type', '-t', type=int, help='Filter by message type')
     parser.add_argument('--plot', '-p', action='store_true', help='Plot vessel track for specified MMSI')
     parser.add_argument('--list', '-l', action='store_true', help='List vessels with names')
     parser.add_argument('--output', '-o', help='Save plot to file')
+    parser.add_argument('--max-points', type=int, default=DEFAULT_TRACK_POINTS,
+                        help=f'Most positions to plot in a track (default: {DEFAULT_TRACK_POINTS})')
+    parser.add_argument('--tolerance', type=float,
+                        help='Drop track points within this error (nm, or square nm for visvalingam)')
+    parser.add_argument('--resample', type=float, metavar='SECONDS', help='Keep one track position per interval')
+    parser.add_argument('--simplify', choices=tracks.METHODS, default='douglas-peucker',
+                        help='Track simplification method (default: douglas-peucker)')
     parser.add_argument('--interactive', '-i', action='store_true', help='Interactive mode')
+    parser.add_argument('--bbox', type=float, nargs=4, metavar=('MIN_LAT', 'MIN_LON', 'MAX_LAT', 'MAX_LON'),
+                        help='Show positions inside a lat/lon box')
+    parser.add_argument('--near', type=float, nargs=2, metavar=('LAT', 'LON'), help='Show vessels near a point')
+    parser.add_argument('--radius', type=float, default=10.0, help='Radius in nm for --near (default: 10)')
+    parser.add_argument('--start', help='Only positions at or after this time (YYYY-MM-DD HH:MM:SS)')
+    parser.add_argument('--end', help='Only positions at or before this time (YYYY-MM-DD HH:MM:SS)')
+    parser.add_argument('--rebuild-index', action='store_true', help='Rebuild the spatial index file')
     
     args = parser.parse_args()
     
-    print(f"Loading data from {args.file}...")
-    df = load_parquet(args.file)
-    print(f"Loaded {len(df)} records")
+    print(f"Opening {args.file}...")
+    # Commands that only look at one vessel or message type read just those rows
+    filtered_only = not (args.stats or args.list or args.interactive or args.bbox or args.near)
+    if filtered_only and (args.mmsi or args.type):
+        data = open_parquet(args.file, mmsi=args.mmsi, msg_type=args.type)
+    else:
+        data = open_parquet(args.file)
+    print(f"{data.num_rows} records")
        
     # List available columns:
-    print(f"Available columns: {list(df.columns)}")
+    print(f"Available columns: {data.columns}")
 
     # If no specific action is requested, enter interactive mode
-    if not (args.stats or args.mmsi or args.type or args.plot or args.list or args.interactive):
+    if not (args.stats or args.mmsi or args.type or args.plot or args.list or args.interactive
+            or args.bbox or args.near):
         args.interactive = True
     
     if args.interactive:
-        interactive_explore(df)
+        interactive_explore(data)
         return
         
     if args.stats:
-        show_basic_stats(df)
+        show_basic_stats(load_columns(data, 'stats'))
     
     if args.list:
-        list_vessels_with_names(df)
+        list_vessels_with_names(load_columns(data, 'list'))
     
     if args.mmsi:
-        filtered = filter_by_mmsi(df, args.mmsi)
+        filtered = filter_by_mmsi(load_columns(data, 'mmsi'), args.mmsi)
         # If plotting is requested for a specific MMSI
         if args.plot:
-            plot_vessel_track(df, args.mmsi, args.output)
+            plot_vessel_track(load_columns(data, 'plot'), args.mmsi, args.output, args.max_points,
+                              args.tolerance, args.resample, args.simplify)
     
     if args.type:
-        filter_by_msg_type(df, args.type)
+        filter_by_msg_type(load_columns(data, 'type'), args.type)
+
+    if args.bbox or args.near:
+        df = load_columns(data, 'spatial')
+        # Built once per file and reused while the file is unchanged
+        index = spatial.load_or_build(args.file, df, rebuild=args.rebuild_index)
+        start, end = parse_time_arg(args.start), parse_time_arg(args.end)
+        if args.bbox:
+            query_bbox(df, index, args.bbox, start, end)
+        if args.near:
+            query_near(df, index, args.near[0], args.near[1], args.radius, start, end)
 
 if __name__ == "__main__":
     main()
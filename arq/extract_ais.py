@@ -1,4 +1,12 @@
 import pyais #add this line
+import argparse
+import json
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from mmapscan import LogScanner, payload_type, payload_mmsi
+from parallel import shard_boundaries
+
 def ascii_to_bit_string(ascii_str):
     """Converts ASCII characters to a bit string."""
     bit_string = ""
@@ -23,51 +31,25 @@ def extract_message_type(ais_line):
 
 def find_unique_message_types(filename):
     """Finds unique AIS message types from a file."""
-    unique_types = set()
     try:
-        with open(filename, 'r') as file:
-            for line in file:
-                message_type = extract_message_type(line)
-                if message_type is not None:
-                    unique_types.add(message_type)
+        # Scans the memory-mapped bytes; only first fragments carry a type
+        with LogScanner(filename) as scanner:
+            unique_types = set(scanner.message_types())
     except FileNotFoundError:
         print(f"Error: File '{filename}' not found.")
         return set()
     return sorted(list(unique_types))
 
-# Example Usage
-filename = '20240911_06053.txt'
-unique_message_types = find_unique_message_types(filename)
-
-if unique_message_types:
-    print(f"Unique AIS message types found: {unique_message_types}")
-
 def count_message_types(filename):
     """Counts the occurrences of each AIS message type."""
-    message_type_counts = {}
     try:
-        with open(filename, 'r') as file:
-            for line in file:
-                message_type = extract_message_type(line)
-                if message_type is not None:
-                    if message_type in message_type_counts:
-                        message_type_counts[message_type] += 1
-                    else:
-                        message_type_counts[message_type] = 1
+        with LogScanner(filename) as scanner:
+            message_type_counts = Counter(scanner.message_types())
     except FileNotFoundError:
         print(f"Error: File '{filename}' not found.")
         return {}
     return dict(sorted(message_type_counts.items()))
 
-# Example usage
-filename = '20240911_06053.txt'
-type_counts = count_message_types(filename)
-
-if type_counts:
-    print("AIS Message Type Counts:")
-    for message_type, count in type_counts.items():
-        print(f"Type {message_type}: {count}")
-
 def inspect_message_type(filename, target_type, num_examples=5):
     """Inspects messages of a specific type."""
     count = 0
@@ -89,6 +71,131 @@ def inspect_message_type(filename, target_type, num_examples=5):
     except FileNotFoundError:
         print(f"Error: File '{filename}' not found.")
 
-# Example usage (inspect type 1 and 5)
-inspect_message_type(filename, 1)
-inspect_message_type(filename, 5)
\ No newline at end of file
+def new_profile():
+    """Empty profile as filled by profile_range."""
+    return {
+        'sentences': 0,
+        'empty_payloads': 0,
+        'continuation_fragments': 0,
+        'channels': Counter(),
+        'types': {},
+    }
+
+def profile_range(filename, start=0, end=None, num_samples=5):
+    """Profiles message types in one pass over a (byte range of a) file."""
+    profile = new_profile()
+    channels = profile['channels']
+    types = profile['types']
+    with LogScanner(filename) as scanner:
+        for sentence in scanner.scan(start=start, end=end):
+            profile['sentences'] += 1
+            channel = bytes(sentence.channel).decode('ascii', 'replace')
+            channels[channel] += 1
+            if sentence.fragment_number > 1:
+                profile['continuation_fragments'] += 1
+                continue
+
+            # The type is read straight from the first payload character
+            message_type = payload_type(sentence.payload)
+            if message_type < 0:
+                profile['empty_payloads'] += 1
+                continue
+
+            entry = types.get(message_type)
+            if entry is None:
+                entry = types[message_type] = {'count': 0, 'channels': Counter(), 'mmsi': set(), 'samples': []}
+            entry['count'] += 1
+            entry['channels'][channel] += 1
+            entry['mmsi'].add(payload_mmsi(sentence.payload))
+            if len(entry['samples']) < num_samples:
+                entry['samples'].append(bytes(sentence.line).decode('ascii', 'replace'))
+        sentence = None  # Drop the last view before the mapping is closed
+    return profile
+
+def merge_profiles(profiles, num_samples=5):
+    """Combines profiles of consecutive byte ranges."""
+    merged = new_profile()
+    for profile in profiles:
+        for key in ('sentences', 'empty_payloads', 'continuation_fragments'):
+            merged[key] += profile[key]
+        merged['channels'].update(profile['channels'])
+        for message_type, entry in profile['types'].items():
+            target = merged['types'].setdefault(
+                message_type, {'count': 0, 'channels': Counter(), 'mmsi': set(), 'samples': []})
+            target['count'] += entry['count']
+            target['channels'].update(entry['channels'])
+            target['mmsi'] |= entry['mmsi']
+            target['samples'].extend(entry['samples'][:num_samples - len(target['samples'])])
+    return merged
+
+def profile_file(filename, num_samples=5, workers=1):
+    """Profiles a file in one pass, optionally split over worker processes."""
+    if workers <= 1:
+        return profile_range(filename, num_samples=num_samples)
+    boundaries = shard_boundaries(filename, workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(profile_range, filename, start, end, num_samples) for start, end in boundaries]
+        return merge_profiles([future.result() for future in futures], num_samples)
+
+def profile_to_json(profile):
+    """JSON-friendly copy of a profile (MMSI sets become counts)."""
+    return {
+        'sentences': profile['sentences'],
+        'empty_payloads': profile['empty_payloads'],
+        'continuation_fragments': profile['continuation_fragments'],
+        'channels': dict(sorted(profile['channels'].items())),
+        'types': {
+            str(message_type): {
+                'count': entry['count'],
+                'channels': dict(sorted(entry['channels'].items())),
+                'unique_mmsi': len(entry['mmsi']),
+                'samples': entry['samples'],
+            }
+            for message_type, entry in sorted(profile['types'].items())
+        },
+    }
+
+def print_profile(profile):
+    """Prints a human-readable profile summary."""
+    print(f"Sentences: {profile['sentences']}")
+    print(f"Empty payloads: {profile['empty_payloads']}")
+    print(f"Continuation fragments: {profile['continuation_fragments']}")
+    print(f"Channels: {dict(sorted(profile['channels'].items()))}")
+    print(f"Unique AIS message types found: {sorted(profile['types'])}")
+    print("AIS Message Type Counts:")
+    for message_type, entry in sorted(profile['types'].items()):
+        print(f"Type {message_type}: {entry['count']} "
+              f"(channels {dict(sorted(entry['channels'].items()))}, {len(entry['mmsi'])} unique MMSIs)")
+        for sample in entry['samples']:
+            print(f"  {sample}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile AIS message types in a log file')
+    parser.add_argument('file', nargs='?', default='20240911_06053.txt', help='NMEA log file')
+    parser.add_argument('--samples', '-n', type=int, default=5, help='Sample lines kept per type')
+    parser.add_argument('--workers', '-w', type=int, default=1, help='Worker processes for big files')
+    parser.add_argument('--json', '-j', nargs='?', const='-', help='Write JSON to a file (or stdout)')
+    parser.add_argument('--inspect', '-i', type=int, action='append', help='Decode examples of this type with pyais')
+    args = parser.parse_args()
+
+    try:
+        profile = profile_file(args.file, args.samples, args.workers)
+    except FileNotFoundError:
+        print(f"Error: File '{args.file}' not found.")
+        sys.exit(1)
+
+    if args.json == '-':
+        json.dump(profile_to_json(profile), sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, 'w') as f:
+            json.dump(profile_to_json(profile), f, indent=2)
+        print(f"Profile written to {args.json}")
+    else:
+        print_profile(profile)
+
+    for target_type in args.inspect or []:
+        inspect_message_type(args.file, target_type)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,303 @@
+"""Table-driven AIS payload decoder.
+
+The armored payload is de-armored in one pass with ``str.translate`` into an
+octal string (one 6-bit symbol is exactly two octal digits) and parsed into a
+single Python int. Fields are then read with precomputed shifts and masks from
+the per-message-type layout tables below, so no intermediate bit strings or
+slice objects are created.
+
+``decode_payload`` returns the same dicts as the BitArray path in decoder.py.
+"""
+
+# 6-bit value of every armored ASCII character, -1 for characters outside the
+# AIS armor alphabet ('0'-'W' and '`'-'w')
+ARMOR = [-1] * 128
+for _code in range(48, 88):
+    ARMOR[_code] = _code - 48
+for _code in range(96, 120):
+    ARMOR[_code] = _code - 56
+
+# str.translate table: armored character -> two octal digits
+_OCTAL = {code: format(value, '02o') for code, value in enumerate(ARMOR) if value >= 0}
+
+# AIS 6-bit ASCII: 0-31 map to '@'-'_', 32-63 map to ' '-'?'
+SIXBIT_ASCII = [chr(code + 64) if code < 32 else chr(code) for code in range(64)]
+
+
+# Scalar converters shared with the BitArray decoders in decoder.py
+def decode_rot(rot_raw):
+    if rot_raw == -128:
+        return None  # Not available
+    if rot_raw == 0:
+        return 0  # Not turning
+
+    sign = 1 if rot_raw > 0 else -1
+    rot_abs = abs(rot_raw)
+    return sign * (rot_abs / 4.733) ** 2
+
+def decode_lon(lon_raw):
+    if lon_raw == 0x6791AC0:  # 181 degrees = not available
+        return None
+    return lon_raw / 600000.0
+
+def decode_lat(lat_raw):
+    if lat_raw == 0x3412140:  # 91 degrees = not available
+        return None
+    return lat_raw / 600000.0
+
+def decode_long_range_lon(lon_raw):
+    if lon_raw == 0x181:  # 181 degrees = not available
+        return None
+    return lon_raw / 10.0
+
+def decode_long_range_lat(lat_raw):
+    if lat_raw == 0x91:  # 91 degrees = not available
+        return None
+    return lat_raw / 10.0
+
+def _tenths(value):
+    return value / 10.0
+
+
+# Layout entries are (key, start bit, width, kind, convert); kind is 'u' for
+# unsigned, 'i' for two's-complement signed and 's' for 6-bit text
+POSITION_REPORT = (
+    ('mmsi', 8, 30, 'u', None),
+    ('navigation_status', 38, 4, 'u', None),
+    ('rot', 42, 8, 'i', decode_rot),
+    ('sog', 50, 10, 'u', _tenths),
+    ('position_accuracy', 60, 1, 'u', None),
+    ('longitude', 61, 28, 'i', decode_lon),
+    ('latitude', 89, 27, 'i', decode_lat),
+    ('cog', 116, 12, 'u', _tenths),
+    ('true_heading', 128, 9, 'u', None),
+    ('timestamp', 137, 6, 'u', None),
+    ('special_manoeuvre', 143, 2, 'u', None),
+    ('raim', 148, 1, 'u', None),
+)
+
+BASE_STATION_REPORT = (
+    ('mmsi', 8, 30, 'u', None),
+    ('year', 38, 14, 'u', None),
+    ('month', 52, 4, 'u', None),
+    ('day', 56, 5, 'u', None),
+    ('hour', 61, 5, 'u', None),
+    ('minute', 66, 6, 'u', None),
+    ('second', 72, 6, 'u', None),
+    ('position_accuracy', 78, 1, 'u', None),
+    ('longitude', 79, 28, 'i', decode_lon),
+    ('latitude', 107, 27, 'i', decode_lat),
+    ('epfd_type', 134, 4, 'u', None),
+    ('raim', 148, 1, 'u', None),
+)
+
+STATIC_DATA = (
+    ('mmsi', 8, 30, 'u', None),
+    ('ais_version', 38, 2, 'u', None),
+    ('imo_number', 40, 30, 'u', None),
+    ('call_sign', 70, 42, 's', None),
+    ('vessel_name', 112, 120, 's', None),
+    ('ship_type', 232, 8, 'u', None),
+    ('dim_to_bow', 240, 9, 'u', None),
+    ('dim_to_stern', 249, 9, 'u', None),
+    ('dim_to_port', 258, 6, 'u', None),
+    ('dim_to_starboard', 264, 6, 'u', None),
+    ('epfd_type', 270, 4, 'u', None),
+    ('eta_month', 274, 4, 'u', None),
+    ('eta_day', 278, 5, 'u', None),
+    ('eta_hour', 283, 5, 'u', None),
+    ('eta_minute', 288, 6, 'u', None),
+    ('draught', 294, 8, 'u', _tenths),
+    ('destination', 302, 120, 's', None),
+)
+
+CLASS_B_POSITION = (
+    ('mmsi', 8, 30, 'u', None),
+    ('sog', 46, 10, 'u', _tenths),
+    ('position_accuracy', 56, 1, 'u', None),
+    ('longitude', 57, 28, 'i', decode_lon),
+    ('latitude', 85, 27, 'i', decode_lat),
+    ('cog', 112, 12, 'u', _tenths),
+    ('true_heading', 124, 9, 'u', None),
+    ('timestamp', 133, 6, 'u', None),
+)
+
+EXTENDED_CLASS_B = CLASS_B_POSITION + (
+    ('vessel_name', 143, 120, 's', None),
+    ('ship_type', 263, 8, 'u', None),
+    ('dim_to_bow', 271, 9, 'u', None),
+    ('dim_to_stern', 280, 9, 'u', None),
+    ('dim_to_port', 289, 6, 'u', None),
+    ('dim_to_starboard', 295, 6, 'u', None),
+)
+
+AID_TO_NAVIGATION = (
+    ('mmsi', 8, 30, 'u', None),
+    ('aid_type', 38, 5, 'u', None),
+    ('name', 43, 120, 's', None),
+    ('position_accuracy', 163, 1, 'u', None),
+    ('longitude', 164, 28, 'i', decode_lon),
+    ('latitude', 192, 27, 'i', decode_lat),
+    ('dim_to_bow', 219, 9, 'u', None),
+    ('dim_to_stern', 228, 9, 'u', None),
+    ('dim_to_port', 237, 6, 'u', None),
+    ('dim_to_starboard', 243, 6, 'u', None),
+    ('epfd_type', 249, 4, 'u', None),
+    ('timestamp', 253, 6, 'u', None),
+    ('off_position', 259, 1, 'u', None),
+    ('raim', 268, 1, 'u', None),
+    ('virtual_aid', 269, 1, 'u', None),
+)
+
+CLASS_B_STATIC_HEADER = (
+    ('mmsi', 8, 30, 'u', None),
+    ('part_number', 38, 2, 'u', None),
+)
+
+CLASS_B_STATIC_A = CLASS_B_STATIC_HEADER + (
+    ('vessel_name', 40, 120, 's', None),
+)
+
+CLASS_B_STATIC_B = CLASS_B_STATIC_HEADER + (
+    ('ship_type', 40, 8, 'u', None),
+    ('vendor_id', 48, 42, 's', None),
+    ('call_sign', 90, 42, 's', None),
+    ('dim_to_bow', 132, 9, 'u', None),
+    ('dim_to_stern', 141, 9, 'u', None),
+    ('dim_to_port', 150, 6, 'u', None),
+    ('dim_to_starboard', 156, 6, 'u', None),
+)
+
+LONG_RANGE_POSITION = (
+    ('mmsi', 8, 30, 'u', None),
+    ('position_accuracy', 38, 1, 'u', None),
+    ('raim', 39, 1, 'u', None),
+    ('navigation_status', 40, 4, 'u', None),
+    ('longitude', 44, 18, 'i', decode_long_range_lon),
+    ('latitude', 62, 17, 'i', decode_long_range_lat),
+    ('sog', 79, 6, 'u', None),
+    ('cog', 85, 9, 'u', None),
+)
+
+# Message type -> (description, layout)
+LAYOUTS = {
+    1: ('Position Report', POSITION_REPORT),
+    2: ('Position Report', POSITION_REPORT),
+    3: ('Position Report', POSITION_REPORT),
+    4: ('Base Station Report', BASE_STATION_REPORT),
+    5: ('Static and Voyage Data', STATIC_DATA),
+    18: ('Class B Position Report', CLASS_B_POSITION),
+    19: ('Extended Class B Position Report', EXTENDED_CLASS_B),
+    21: ('Aid to Navigation Report', AID_TO_NAVIGATION),
+    24: ('Class B Static Data', CLASS_B_STATIC_HEADER),
+    27: ('Long Range Position Report', LONG_RANGE_POSITION),
+}
+
+# Type 24 layouts selected by part number
+CLASS_B_STATIC_PARTS = {
+    0: CLASS_B_STATIC_A,
+    1: CLASS_B_STATIC_B,
+}
+
+
+def compile_layout(layout):
+    """Turn a layout into (length, fields) with shifts relative to that length."""
+    length = max(start + width for _, start, width, _, _ in layout)
+    fields = []
+    for key, start, width, kind, convert in layout:
+        shift = length - start - width
+        mask = (1 << width) - 1
+        fields.append((key, shift, mask, width, kind, convert))
+    return length, tuple(fields)
+
+
+def required_bits(compiled):
+    """Bits a payload needs to carry every field of a compiled layout.
+
+    A text field at the end may lose its last, partial character: senders
+    cut payloads at a whole number of characters (a 70-character type 5
+    has 420 of the 424 bits).
+    """
+    length, fields = compiled
+    last = min(fields, key=lambda field: field[1])  # Smallest shift ends the layout
+    return length - 5 if last[4] == 's' else length
+
+
+COMPILED = {msg_type: compile_layout(layout) for msg_type, (_, layout) in LAYOUTS.items()}
+COMPILED_CLASS_B_STATIC = {part: compile_layout(layout) for part, layout in CLASS_B_STATIC_PARTS.items()}
+
+
+def dearmor(payload):
+    """De-armor a payload (str, bytes or memoryview) into (value, bit_count)."""
+    if not isinstance(payload, str):
+        payload = str(payload, 'ascii')
+    value = int(payload.translate(_OCTAL), 8)
+    return value, 6 * len(payload)
+
+
+def try_dearmor(payload):
+    """Like dearmor, but returns None instead of raising for non-armor characters."""
+    if not isinstance(payload, str):
+        payload = str(payload, 'ascii', 'replace')
+    octal = payload.translate(_OCTAL)
+    # Characters outside the alphabet are left as one character instead of two
+    if len(octal) != 2 * len(payload):
+        return None
+    return int(octal, 8), 6 * len(payload)
+
+
+def message_type(payload):
+    """Read the message type from the first armored character."""
+    code = ord(payload[0]) if isinstance(payload, str) else payload[0]
+    return ARMOR[code] if code < 128 else -1
+
+
+def decode_text(raw, width):
+    """Decode a 6-bit ASCII field, dropping '@' padding and outer spaces."""
+    chars = [SIXBIT_ASCII[(raw >> shift) & 0x3F] for shift in range(width - 6, -1, -6)]
+    return ''.join(chars).replace('@', '').strip()
+
+
+def extract_fields(value, bit_count, compiled, result):
+    """Read the compiled fields of a de-armored payload into result."""
+    length, fields = compiled
+    # Align the payload to the layout length; missing trailing bits read as zero
+    if bit_count < length:
+        value <<= length - bit_count
+    elif bit_count > length:
+        value >>= bit_count - length
+
+    for key, shift, mask, width, kind, convert in fields:
+        raw = (value >> shift) & mask
+        if kind == 's':
+            result[key] = decode_text(raw, width)
+            continue
+        if kind == 'i' and raw >> (width - 1):
+            raw -= 1 << width
+        result[key] = convert(raw) if convert else raw
+    return result
+
+
+def decode_payload(payload):
+    """Decode an armored payload into the same dict as decoder.decode_payload."""
+    if not payload:
+        raise ValueError("Empty payload")
+    value, bit_count = dearmor(payload)
+    msg_type = value >> (bit_count - 6)
+
+    entry = LAYOUTS.get(msg_type)
+    if entry is None:
+        return {
+            'msg_type': msg_type,
+            'raw': format(value, f'0{bit_count}b'),
+            'decoded': f"Unsupported message type: {msg_type}"
+        }
+
+    result = {'msg_type': msg_type, 'msg_description': entry[0]}
+    extract_fields(value, bit_count, COMPILED[msg_type], result)
+
+    if msg_type == 24:
+        compiled = COMPILED_CLASS_B_STATIC.get(result['part_number'])
+        if compiled:
+            extract_fields(value, bit_count, compiled, result)
+    return result
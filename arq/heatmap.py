@@ -0,0 +1,151 @@
+"""Pre-aggregated position counts for interactive heatmaps.
+
+Positions are counted per time bucket (a minute by default) and lat/lon grid
+cell, at several cell sizes. Each level is stored as three arrays sorted by
+(bucket, cell key), so the counts for any time range are one contiguous
+slice found with ``searchsorted``. A query sums that slice per cell and
+returns at most ``max_cells`` weighted cells, picking the finest level that
+fits, so the size of what is sent to the map does not depend on how many
+raw positions the range holds. Tiles are saved next to the Parquet file they
+were built from (``<file>.heatmap.npz``) and rebuilt when that file changes.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from spatial import coordinate_columns, epoch_seconds, file_signature, time_column
+from timestamps import NAT
+
+DEFAULT_BUCKET_SECONDS = 60
+DEFAULT_CELL_SIZES = (1.0, 0.25, 0.05, 0.01)  # degrees, coarsest first
+DEFAULT_MAX_CELLS = 2000
+
+
+def _cell_keys(lat, lon, cell_size):
+    columns = int(round(360 / cell_size))
+    cell_rows = np.minimum(np.floor((lat + 90) / cell_size).astype(np.int64), int(round(180 / cell_size)) - 1)
+    cell_columns = np.minimum(np.floor((lon + 180) / cell_size).astype(np.int64), columns - 1)
+    return cell_rows * columns + cell_columns
+
+
+class HeatmapTiles:
+    """Position counts per time bucket and grid cell at several resolutions."""
+
+    def __init__(self, bucket_seconds, cell_sizes, levels, start_time, end_time, signature=None):
+        self.bucket_seconds = bucket_seconds
+        self.cell_sizes = tuple(cell_sizes)
+        self.levels = levels  # One (buckets, cell keys, counts) per cell size
+        self.start_time = start_time  # Epoch seconds of the first and last position
+        self.end_time = end_time
+        self.signature = signature
+
+    @classmethod
+    def build(cls, df, bucket_seconds=DEFAULT_BUCKET_SECONDS, cell_sizes=DEFAULT_CELL_SIZES, signature=None):
+        """Count the valid, timed positions of df."""
+        lat_name, lon_name = coordinate_columns(df)
+        lat = pd.to_numeric(df[lat_name], errors='coerce').to_numpy(dtype=np.float64)
+        lon = pd.to_numeric(df[lon_name], errors='coerce').to_numpy(dtype=np.float64)
+        time_name = time_column(df)
+        if time_name is None:
+            raise KeyError("No time column found")
+        time = epoch_seconds(df[time_name])
+
+        with np.errstate(invalid='ignore'):
+            valid = (np.abs(lat) <= 90) & (np.abs(lon) <= 180) & (time != NAT)
+        lat, lon, time = lat[valid], lon[valid], time[valid]
+        buckets = time // bucket_seconds
+
+        levels = []
+        for cell_size in cell_sizes:
+            keys = _cell_keys(lat, lon, cell_size)
+            # (bucket, cell) pairs with their counts, sorted by bucket then cell
+            pairs, counts = np.unique(np.stack([buckets, keys], axis=1), axis=0, return_counts=True)
+            levels.append((pairs[:, 0].copy(), pairs[:, 1].copy(), counts.astype(np.int32)))
+
+        start_time = int(time.min()) if len(time) else NAT
+        end_time = int(time.max()) if len(time) else NAT
+        return cls(bucket_seconds, cell_sizes, levels, start_time, end_time, signature)
+
+    def save(self, path):
+        arrays = {}
+        for i, (buckets, keys, counts) in enumerate(self.levels):
+            arrays[f'buckets_{i}'] = buckets
+            arrays[f'keys_{i}'] = keys
+            arrays[f'counts_{i}'] = counts
+        np.savez_compressed(
+            path,
+            bucket_seconds=self.bucket_seconds,
+            cell_sizes=np.array(self.cell_sizes, dtype=np.float64),
+            times=np.array([self.start_time, self.end_time], dtype=np.int64),
+            signature=np.array(self.signature or (0, 0), dtype=np.int64),
+            **arrays,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            cell_sizes = data['cell_sizes'].tolist()
+            levels = [
+                (data[f'buckets_{i}'], data[f'keys_{i}'], data[f'counts_{i}'])
+                for i in range(len(cell_sizes))
+            ]
+            start_time, end_time = data['times'].tolist()
+            return cls(
+                int(data['bucket_seconds']), cell_sizes, levels, start_time, end_time,
+                tuple(data['signature'].tolist()),
+            )
+
+    def _level_counts(self, level, start, end):
+        """(cell keys, summed counts) for the buckets from start to end."""
+        buckets, keys, counts = self.levels[level]
+        first = -np.inf if start is None else start // self.bucket_seconds
+        last = np.inf if end is None else end // self.bucket_seconds
+        lo = np.searchsorted(buckets, first, side='left')
+        hi = np.searchsorted(buckets, last, side='right')
+        cells, inverse = np.unique(keys[lo:hi], return_inverse=True)
+        return cells, np.bincount(inverse, weights=counts[lo:hi], minlength=len(cells))
+
+    def query(self, start=None, end=None, max_cells=DEFAULT_MAX_CELLS):
+        """Weighted cell centres for positions between start and end (epoch seconds).
+
+        Times are matched at bucket resolution. Returns a DataFrame with
+        lat, lon and count columns and at most max_cells rows, from the
+        finest level that fits; if even the coarsest level has more cells,
+        the busiest max_cells of it are returned.
+        """
+        for level in range(len(self.cell_sizes) - 1, -1, -1):
+            cells, weights = self._level_counts(level, start, end)
+            if len(cells) <= max_cells or level == 0:
+                break
+        if len(cells) > max_cells:
+            busiest = np.argsort(weights, kind='stable')[::-1][:max_cells]
+            cells, weights = cells[busiest], weights[busiest]
+
+        cell_size = self.cell_sizes[level]
+        columns = int(round(360 / cell_size))
+        return pd.DataFrame({
+            'lat': (cells // columns + 0.5) * cell_size - 90,
+            'lon': (cells % columns + 0.5) * cell_size - 180,
+            'count': weights.astype(np.int64),
+        })
+
+
+def tiles_path(parquet_path):
+    return parquet_path.rstrip(os.sep) + '.heatmap.npz'
+
+
+def load_or_build(parquet_path, df, bucket_seconds=DEFAULT_BUCKET_SECONDS, cell_sizes=DEFAULT_CELL_SIZES,
+                  rebuild=False):
+    """Return the tiles saved next to parquet_path, building them if stale or missing."""
+    path = tiles_path(parquet_path)
+    signature = file_signature(parquet_path)
+    if not rebuild and os.path.exists(path):
+        tiles = HeatmapTiles.load(path)
+        if (tiles.signature == signature and tiles.bucket_seconds == bucket_seconds
+                and tiles.cell_sizes == tuple(cell_sizes)):
+            return tiles
+    tiles = HeatmapTiles.build(df, bucket_seconds, cell_sizes, signature)
+    tiles.save(path)
+    return tiles
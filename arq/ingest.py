@@ -0,0 +1,336 @@
+"""Real-time NMEA ingest over UDP and TCP.
+
+``IngestServer`` accepts sentences the way AIS receivers and aggregators
+push them (one or more lines per UDP datagram, or a line-oriented TCP
+stream), reassembles multipart messages per source, decodes them into
+records and fans the records out to any number of async subscribers.
+
+Backpressure: every line goes through one bounded queue. TCP connections
+wait for room in it, so a slow pipeline slows the senders down through TCP
+flow control; UDP cannot be paused, so datagrams arriving while the queue is
+full are dropped and counted. Subscribers have bounded queues too; a normal
+subscriber makes the dispatcher wait for it, a lossy one drops messages it
+cannot keep up with.
+
+Each UDP source address gets its own reassembler. Sources are kept in
+least-recently-heard order and evicted once more than ``max_udp_sources``
+are open or one has been silent for ``udp_idle`` seconds, so a long-running
+service does not grow with every sender it has ever heard.
+"""
+
+import argparse
+import asyncio
+import socket
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from reassembly import Reassembler
+from records import try_decode_record
+from vessels import VesselTable
+
+DEFAULT_PORT = 10110  # Conventional NMEA-over-IP port
+UDP_RECEIVE_BUFFER = 1 << 22  # Absorbs bursts while the dispatcher catches up
+MAX_UDP_SOURCES = 1000
+UDP_IDLE_SECONDS = 600
+
+_END = object()  # Queued to subscribers when the server closes
+
+
+class Subscription:
+    """Async iterator over decoded records delivered by an IngestServer."""
+
+    def __init__(self, server, maxsize, lossy):
+        self.server = server
+        self.queue = asyncio.Queue(maxsize)
+        self.lossy = lossy
+        self.dropped = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.closed and self.queue.empty():
+            raise StopAsyncIteration
+        item = await self.queue.get()
+        if item is _END:
+            raise StopAsyncIteration
+        return item
+
+    async def _deliver(self, record):
+        if not self.lossy:
+            await self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def _end(self):
+        self.closed = True
+        try:
+            self.queue.put_nowait(_END)
+        except asyncio.QueueFull:
+            pass  # The consumer sees closed once it has drained the queue
+
+    def close(self):
+        """Stop receiving records."""
+        self.server.unsubscribe(self)
+
+
+class _UDPProtocol(asyncio.DatagramProtocol):
+
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        server = self.server
+        reassembler = server._udp_reassembler(addr)
+        for line in data.decode('ascii', 'replace').splitlines():
+            if not line.strip():
+                continue
+            try:
+                server.lines.put_nowait((reassembler, line))
+            except asyncio.QueueFull:
+                server.stats['udp_dropped'] += 1
+
+
+class IngestServer:
+    """Receive NMEA sentences over UDP/TCP and publish decoded records."""
+
+    def __init__(self, host='0.0.0.0', udp_port=DEFAULT_PORT, tcp_port=DEFAULT_PORT, queue_size=10000,
+                 max_udp_sources=MAX_UDP_SOURCES, udp_idle=UDP_IDLE_SECONDS):
+        self.host = host
+        self.udp_port = udp_port
+        self.tcp_port = tcp_port
+        self.lines = None
+        self.queue_size = queue_size
+        self.subscribers = []
+        self.max_udp_sources = max_udp_sources
+        self.udp_idle = udp_idle
+        self.udp_sources = OrderedDict()  # address -> [Reassembler, last heard], least recent first
+        self.last_error = None  # Latest unexpected exception in the dispatcher
+        self.transport = None
+        self.tcp_server = None
+        self.dispatcher = None
+        self.stats = {
+            'lines': 0,
+            'messages': 0,
+            'decode_errors': 0,
+            'udp_dropped': 0,
+            'udp_evicted': 0,
+            'dispatch_errors': 0,
+            'malformed': 0,
+            'expired': 0,
+            'dropped': 0,
+            'connections': 0,
+        }
+
+    def _on_discard(self, lines, reason):
+        self.stats[reason] += len(lines)
+
+    def _new_reassembler(self):
+        return Reassembler(on_discard=self._on_discard)
+
+    def _udp_reassembler(self, addr):
+        now = time.monotonic()
+        sources = self.udp_sources
+        entry = sources.get(addr)
+        if entry is None:
+            entry = sources[addr] = [self._new_reassembler(), now]
+        else:
+            entry[1] = now
+            sources.move_to_end(addr)
+        self._evict_udp_sources(now)
+        return entry[0]
+
+    def _evict_udp_sources(self, now):
+        """Drop the least recently heard sources over the limit or idle too long."""
+        sources = self.udp_sources
+        while sources:
+            addr, (reassembler, heard) = next(iter(sources.items()))
+            if len(sources) <= self.max_udp_sources and now - heard <= self.udp_idle:
+                break
+            del sources[addr]
+            self.stats['udp_evicted'] += 1
+            try:
+                # Flush its incomplete groups after its queued lines, as for a closed TCP connection
+                self.lines.put_nowait((reassembler, None))
+            except asyncio.QueueFull:
+                reassembler.flush()
+
+    def subscribe(self, maxsize=1000, lossy=False):
+        """Return a Subscription receiving every decoded record from now on."""
+        subscription = Subscription(self, maxsize, lossy)
+        self.subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        if subscription in self.subscribers:
+            self.subscribers.remove(subscription)
+        subscription._end()
+
+    async def start(self):
+        """Open the listeners (a port of None disables that protocol)."""
+        loop = asyncio.get_running_loop()
+        self.lines = asyncio.Queue(self.queue_size)
+        self.dispatcher = asyncio.create_task(self._dispatch())
+        if self.udp_port is not None:
+            self.transport, _ = await loop.create_datagram_endpoint(
+                lambda: _UDPProtocol(self), local_addr=(self.host, self.udp_port))
+            sock = self.transport.get_extra_info('socket')
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_RECEIVE_BUFFER)
+            except OSError:
+                pass  # Keep the system default
+        if self.tcp_port is not None:
+            self.tcp_server = await asyncio.start_server(self._handle_tcp, self.host, self.tcp_port)
+
+    async def close(self, drain_timeout=5.0):
+        """Stop listening, decode what is queued and end all subscriptions.
+
+        Queued lines get up to drain_timeout seconds to reach subscribers.
+        """
+        if self.transport is not None:
+            self.transport.close()
+        if self.tcp_server is not None:
+            # Not waiting for wait_closed(): on newer Pythons it blocks until
+            # every client disconnects
+            self.tcp_server.close()
+        if self.dispatcher is not None:
+            try:
+                await asyncio.wait_for(self.lines.join(), drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+            self.dispatcher.cancel()
+        for subscription in list(self.subscribers):
+            self.unsubscribe(subscription)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _handle_tcp(self, reader, writer):
+        self.stats['connections'] += 1
+        reassembler = self._new_reassembler()
+        try:
+            while True:
+                try:
+                    data = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break  # Line over the stream limit or connection reset
+                if not data:
+                    break
+                line = data.decode('ascii', 'replace').strip()
+                if line:
+                    # Waits while the pipeline is full: TCP backpressure
+                    await self.lines.put((reassembler, line))
+        finally:
+            # Flush the connection's incomplete groups after its queued lines
+            await self.lines.put((reassembler, None))
+            writer.close()
+
+    async def _dispatch(self):
+        lines = self.lines
+        while True:
+            reassembler, line = await lines.get()
+            try:
+                if line is None:
+                    reassembler.flush()
+                    continue
+                self.stats['lines'] += 1
+                message = reassembler.feed(line)
+                if message is None or not message.sentences[0].startswith('!AIVDM'):
+                    continue
+                status, record, error = try_decode_record(message.payload)
+                if record is None:
+                    self.stats['decode_errors'] += 1
+                    continue
+                # Lines without a receiver timestamp are stamped on arrival
+                record['timestamp'] = message.timestamp or datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+                self.stats['messages'] += 1
+                for subscription in self.subscribers:
+                    await subscription._deliver(record)
+            except Exception as e:
+                # A bad line or a failing subscriber must not stop the dispatcher:
+                # the TCP handlers would block on the full queue forever
+                self.stats['dispatch_errors'] += 1
+                self.last_error = e
+            finally:
+                lines.task_done()
+
+
+async def _print_records(subscription):
+    async for record in subscription:
+        print(record.to_dict())
+
+
+async def _drain(subscription):
+    async for _ in subscription:
+        pass
+
+
+async def _track_vessels(subscription, vessels):
+    async for record in subscription:
+        vessels.update(record)
+
+
+async def _snapshot(vessels, path, interval):
+    while True:
+        await asyncio.sleep(interval)
+        vessels.to_parquet(path)
+
+
+async def _report(server, interval):
+    previous = 0
+    while True:
+        await asyncio.sleep(interval)
+        messages = server.stats['messages']
+        print(f"{(messages - previous) / interval:,.0f} msg/s  {server.stats}")
+        previous = messages
+
+
+async def serve(args):
+    server = IngestServer(args.host, args.udp, args.tcp, args.queue_size)
+    async with server:
+        print(f"Listening on {args.host} (UDP {args.udp}, TCP {args.tcp})")
+        tasks = [asyncio.create_task(_report(server, args.interval))]
+        if args.print:
+            tasks.append(asyncio.create_task(_print_records(server.subscribe())))
+        else:
+            # Drain messages so the pipeline keeps flowing
+            tasks.append(asyncio.create_task(_drain(server.subscribe())))
+        if args.snapshot:
+            vessels = VesselTable()
+            tasks.append(asyncio.create_task(_track_vessels(server.subscribe(), vessels)))
+            tasks.append(asyncio.create_task(_snapshot(vessels, args.snapshot, args.interval)))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Receive and decode NMEA sentences over UDP/TCP')
+    parser.add_argument('--host', default='0.0.0.0', help='Address to listen on')
+    parser.add_argument('--udp', type=int, default=DEFAULT_PORT, help=f'UDP port (default: {DEFAULT_PORT})')
+    parser.add_argument('--tcp', type=int, default=DEFAULT_PORT, help=f'TCP port (default: {DEFAULT_PORT})')
+    parser.add_argument('--queue-size', type=int, default=10000, help='Lines buffered before senders are slowed down')
+    parser.add_argument('--interval', type=float, default=5.0, help='Seconds between throughput reports')
+    parser.add_argument('--print', action='store_true', help='Print every decoded message')
+    parser.add_argument('--snapshot', metavar='PATH', help='Write the live vessel table to this Parquet file every interval')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
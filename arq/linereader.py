@@ -0,0 +1,70 @@
+"""Constant-memory streaming of NMEA log files.
+
+Files are read in large binary blocks and split into lines as they go, so
+only one block is ever held in memory. ``iter_chunks`` groups lines into
+chunks without cutting a multipart message in two.
+"""
+
+DEFAULT_BUFFER_SIZE = 1 << 20  # 1 MiB
+
+
+def read_raw_lines(path, buffer_size=DEFAULT_BUFFER_SIZE, start=0, end=None):
+    """Yield the non-empty lines of a file as stripped bytes.
+
+    start and end restrict reading to a byte range; they should fall on line
+    boundaries (see parallel.shard_boundaries).
+    """
+    with open(path, 'rb', buffering=0) as f:
+        f.seek(start)
+        remaining = end - start if end is not None else None
+        tail = b''
+        while True:
+            size = buffer_size if remaining is None else min(buffer_size, remaining)
+            block = f.read(size) if size > 0 else b''
+            if not block:
+                break
+            if remaining is not None:
+                remaining -= len(block)
+            lines = (tail + block).split(b'\n')
+            # The last piece may be an incomplete line; carry it into the next block
+            tail = lines.pop()
+            for line in lines:
+                line = line.strip()
+                if line:
+                    yield line
+        tail = tail.strip()
+        if tail:
+            yield tail
+
+
+def read_lines(path, buffer_size=DEFAULT_BUFFER_SIZE, encoding='ascii', start=0, end=None):
+    """Yield the non-empty lines of a file as stripped strings."""
+    for line in read_raw_lines(path, buffer_size, start, end):
+        yield line.decode(encoding, 'replace')
+
+
+def is_open_fragment(line):
+    """True if line is a fragment that is not the last of its message."""
+    parts = line.split(',', 3)
+    if len(parts) < 4:
+        return False
+    try:
+        return int(parts[2]) < int(parts[1])
+    except ValueError:
+        return False
+
+
+def iter_chunks(lines, chunk_size=2000):
+    """Group lines into lists of about chunk_size.
+
+    A chunk is only closed after a line that completes its message, so
+    consecutive fragments of a multipart message always share a chunk.
+    """
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= chunk_size and not is_open_fragment(line):
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
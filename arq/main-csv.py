@@ -1,45 +1,37 @@
+import os
 from pyais import decode
+from pyais.exceptions import AISBaseException
+from errors import EMPTY_PAYLOAD, MALFORMED, ORPHAN_FRAGMENT, ErrorAccounting, classify
+from reassembly import Reassembler, raw_line
+from linereader import read_lines, iter_chunks
+from prefilter import Prefilter
+from timestamps import extract_timestamp, strip_timestamp
 import csv
 
-# Decode single or multi-part messages
-def decode_message(lines, start_idx, multi_part_buffer):
-    line = lines[start_idx].strip()
-    parts = line.split(',')
-    if len(parts) < 6 or not parts[5]:
-        raise ValueError("Empty or malformed payload")
-    
-    if parts[1] == "2" and parts[2] == "1":  # First part
-        seq_id = parts[3]
-        if start_idx + 1 < len(lines) and lines[start_idx + 1].split(',')[1] == "2" and lines[start_idx + 1].split(',')[2] == "2" and lines[start_idx + 1].split(',')[3] == seq_id:
-            return decode(line.split(',2024-')[0], lines[start_idx + 1].split(',2024-')[0])
-        else:
-            multi_part_buffer[seq_id] = line
-            raise ValueError("Missing second part")
-    elif parts[1] == "2" and parts[2] == "2":  # Second part
-        seq_id = parts[3]
-        if seq_id in multi_part_buffer:
-            decoded = decode(multi_part_buffer[seq_id].split(',2024-')[0], line.split(',2024-')[0])
-            del multi_part_buffer[seq_id]
-            return decoded
-        raise ValueError("Missing first part")
-    return decode(line.split(',2024-')[0])
+# Decode a reassembled single or multi-part message into (decoded, category,
+# error); category is an errors category, None on success. Only pyais's own
+# exceptions mean a bad message; anything else is a bug and propagates
+def decode_message(message):
+    if not message.payload:
+        return None, EMPTY_PAYLOAD, "Empty payload"
+    try:
+        return decode(*message.sentences), None, None
+    except AISBaseException as e:
+        return None, classify(e), e
 
-# Process a chunk of lines
-def process_chunk(chunk, multi_part_buffer, error_log):
+# Process a chunk of lines; fragments split across chunks stay in the reassembler
+def process_chunk(chunk, reassembler, error_log):
     decoded_chunk = []
-    i = 0
-    while i < len(chunk):
-        try:
-            decoded = decode_message(chunk, i, multi_part_buffer)
-            raw = chunk[i] if "2,1" not in chunk[i] else f"{chunk[i].split(',2024-')[0]} + {chunk[i + 1].split(',2024-')[0]}"
-            decoded_chunk.append((decoded, raw))
-            i += 2 if "2,1" in chunk[i] else 1
-        except Exception as e:
-            error_msg = f"Error decoding line {i + 1}: {chunk[i]} - {e}"
-            print(error_msg)
-            error_log.append(chunk[i])
-            i += 1
-    return decoded_chunk, multi_part_buffer, error_log
+    for message in reassembler.process(prefilter.filter(chunk)):
+        raw = raw_line(message)
+        decoded, category, error = decode_message(message)
+        if category is not None:
+            # Counted, not printed: one line per failure slows the loop down
+            errors.record(category, raw, error)
+            error_log.append(raw)
+            continue
+        decoded_chunk.append((decoded, raw))
+    return decoded_chunk, reassembler, error_log
 
 # Write to CSV
 def write_to_csv(decoded_list, output_file):
@@ -51,7 +43,7 @@ def write_to_csv(decoded_list, output_file):
         for decoded, raw in decoded_list:
             msg_type = decoded.msg_type
             mmsi = decoded.mmsi
-            timestamp = raw.split(',2024-')[1] if ',2024-' in raw else 'N/A'
+            timestamp = extract_timestamp(raw) or 'N/A'
             row = {
                 'msg_type': msg_type,
                 'mmsi': mmsi,
@@ -76,7 +68,7 @@ def summarize_decoded(decoded_list, section):
         mmsi = decoded.mmsi
         msg_types[msg_type] = msg_types.get(msg_type, 0) + 1
         mmsi_set.add(mmsi)
-        print(f"Type: {msg_type}, MMSI: {mmsi}, Raw: {raw.split(',2024-')[0]}")
+        print(f"Type: {msg_type}, MMSI: {mmsi}, Raw: {strip_timestamp(raw)}")
         if msg_type in [1, 2, 3, 18]:
             print(f"  Lat: {decoded.lat}, Lon: {decoded.lon}, Speed: {decoded.speed}")
         elif msg_type == 5:
@@ -88,31 +80,61 @@ def summarize_decoded(decoded_list, section):
 filename = "20240911_06053.txt"
 output_file = "decoded_ais_data.csv"
 error_log_file = "ais_errors.txt"
-chunk_size = 2000  # Increased to reduce split multi-part messages
-multi_part_buffer = {}
+chunk_size = 2000  # Chunks never split a multi-part message
 error_log = []
+errors = ErrorAccounting()  # Counts by category; the lines go to error_log_file
+
+# Rejected lines are counted by category and kept for error_log_file
+def reject(line, reason):
+    errors.record(reason, line)
+    error_log.append(line)
+
+def discard(lines, reason):
+    for line in lines:
+        reject(line, MALFORMED if reason == 'malformed' else ORPHAN_FRAGMENT)
+
+reassembler = Reassembler(on_discard=discard)
+# Junk lines are rejected from their fields and checksum before reassembly
+prefilter = Prefilter(on_reject=reject)
+
+file_size = os.path.getsize(filename)
+bytes_read = 0
+total_lines = 0
+
+# Stream chunks, looking one ahead so the last chunk can be recognised
+chunks = iter_chunks(read_lines(filename), chunk_size)
+chunk = next(chunks, None)
+first = True
+middle_done = False
+while chunk is not None:
+    next_chunk = next(chunks, None)
+    chunk_bytes = sum(len(line) + 1 for line in chunk)
+    decoded_chunk, reassembler, error_log = process_chunk(chunk, reassembler, error_log)
+    write_to_csv(decoded_chunk, output_file)
+    
+    if first:
+        summarize_decoded(decoded_chunk[:min(30, len(decoded_chunk))], "First 30 Lines")
+        first = False
+    elif not middle_done and bytes_read + chunk_bytes >= file_size // 2:
+        middle = int(len(decoded_chunk) * (file_size // 2 - bytes_read) / chunk_bytes)
+        middle_start = max(0, middle - 5)
+        middle_end = min(middle_start + 10, len(decoded_chunk))
+        summarize_decoded(decoded_chunk[middle_start:middle_end], "Middle Sample")
+        middle_done = True
+    if next_chunk is None:
+        summarize_decoded(decoded_chunk[-min(20, len(decoded_chunk)):], "Last 20 Lines")
+
+    bytes_read += chunk_bytes
+    total_lines += len(chunk)
+    chunk = next_chunk
 
-with open(filename, 'r') as f:
-    lines = [line.strip() for line in f.readlines() if line.strip()]
-    total_lines = len(lines)
-    print(f"Total lines in file: {total_lines}")
+print(f"Total lines in file: {total_lines}")
 
-    all_decoded = []
-    for start in range(0, total_lines, chunk_size):
-        end = min(start + chunk_size, total_lines)
-        chunk = lines[start:end]
-        decoded_chunk, multi_part_buffer, error_log = process_chunk(chunk, multi_part_buffer, error_log)
-        all_decoded.extend(decoded_chunk)
-        write_to_csv(decoded_chunk, output_file)
-        
-        if start == 0:
-            summarize_decoded(decoded_chunk[:min(30, len(decoded_chunk))], "First 30 Lines")
-        elif start <= total_lines // 2 < end:
-            middle_start = max(0, (total_lines // 2) - start - 5)
-            middle_end = min(middle_start + 10, len(decoded_chunk))
-            summarize_decoded(decoded_chunk[middle_start:middle_end], "Middle Sample")
-        if end == total_lines:
-            summarize_decoded(decoded_chunk[-min(20, len(decoded_chunk)):], "Last 20 Lines")
+# Fragments still waiting for their partners at end of file are errors too
+reassembler.flush()
+print(f"Prefilter: {dict(prefilter.stats)}")
+print(f"Reassembly: {reassembler.stats}")
+errors.print_summary()
 
 # Write errors to log file
 with open(error_log_file, 'w') as f:
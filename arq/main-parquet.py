@@ -1,55 +1,61 @@
 import os
-
 from pyais import decode
-import pandas as pd
-
-# Decode single or multi-part messages
-def decode_message(lines, start_idx, multi_part_buffer):
-    line = lines[start_idx].strip()
-    parts = line.split(',')
-    if len(parts) < 6 or not parts[5]:
-        raise ValueError("Empty or malformed payload")
-    
-    if parts[1] == "2" and parts[2] == "1":  # First part
-        seq_id = parts[3]
-        if start_idx + 1 < len(lines) and lines[start_idx + 1].split(',')[1] == "2" and lines[start_idx + 1].split(',')[2] == "2" and lines[start_idx + 1].split(',')[3] == seq_id:
-            return decode(line.split(',2024-')[0], lines[start_idx + 1].split(',2024-')[0])
-        else:
-            multi_part_buffer[seq_id] = line
-            raise ValueError("Missing second part")
-    elif parts[1] == "2" and parts[2] == "2":  # Second part
-        seq_id = parts[3]
-        if seq_id in multi_part_buffer:
-            decoded = decode(multi_part_buffer[seq_id].split(',2024-')[0], line.split(',2024-')[0])
-            del multi_part_buffer[seq_id]
-            return decoded
-        raise ValueError("Missing first part")
-    return decode(line.split(',2024-')[0])
-
-# Process a chunk of lines
-def process_chunk(chunk, multi_part_buffer, error_log):
+from pyais.exceptions import AISBaseException
+from errors import EMPTY_PAYLOAD, MALFORMED, ORPHAN_FRAGMENT, ErrorAccounting, classify
+from reassembly import Reassembler, raw_line
+from linereader import read_lines, iter_chunks
+from prefilter import Prefilter
+from timestamps import TimestampParser, extract_timestamp, strip_timestamp
+import pyarrow as pa
+from dataset import PartitionedSink
+
+# Decode a reassembled single or multi-part message into (decoded, category,
+# error); category is an errors category, None on success. Only pyais's own
+# exceptions mean a bad message; anything else is a bug and propagates
+def decode_message(message):
+    if not message.payload:
+        return None, EMPTY_PAYLOAD, "Empty payload"
+    try:
+        return decode(*message.sentences), None, None
+    except AISBaseException as e:
+        return None, classify(e), e
+
+# Process a chunk of lines; fragments split across chunks stay in the reassembler
+def process_chunk(chunk, reassembler, error_log):
     decoded_chunk = []
-    i = 0
-    while i < len(chunk):
-        try:
-            decoded = decode_message(chunk, i, multi_part_buffer)
-            raw = chunk[i] if "2,1" not in chunk[i] else f"{chunk[i].split(',2024-')[0]} + {chunk[i + 1].split(',2024-')[0]}"
-            decoded_chunk.append((decoded, raw))
-            i += 2 if "2,1" in chunk[i] else 1
-        except Exception as e:
-            error_msg = f"Error decoding line {i + 1}: {chunk[i]} - {e}"
-            print(error_msg)
-            error_log.append(chunk[i])
-            i += 1
-    return decoded_chunk, multi_part_buffer, error_log
+    for message in reassembler.process(prefilter.filter(chunk)):
+        raw = raw_line(message)
+        decoded, category, error = decode_message(message)
+        if category is not None:
+            # Counted, not printed: one line per failure slows the loop down
+            errors.record(category, raw, error)
+            error_log.append(raw)
+            continue
+        decoded_chunk.append((decoded, raw))
+    return decoded_chunk, reassembler, error_log
+
+# Fixed output schema so every chunk lands in the same dataset
+OUTPUT_SCHEMA = pa.schema([
+    ('msg_type', pa.int16()),
+    ('mmsi', pa.int64()),
+    ('lat', pa.float64()),
+    ('lon', pa.float64()),
+    ('speed', pa.float64()),
+    ('course', pa.float64()),
+    ('vessel_name', pa.string()),
+    ('ship_type', pa.int64()),
+    ('timestamp', pa.timestamp('s')),
+    ('raw', pa.string()),
+])
 
 # Write to Parquet
-def write_to_parquet(decoded_list, output_file):
+def write_to_parquet(decoded_list, sink):
     rows = []
     for decoded, raw in decoded_list:
         msg_type = decoded.msg_type
         mmsi = decoded.mmsi
-        timestamp = raw.split(',2024-')[1] if ',2024-' in raw else 'N/A'
+        timestamp = timestamp_parser.parse(extract_timestamp(raw))
+        ship_type = getattr(decoded, 'ship_type', None) if msg_type == 5 else None
         row = {
             'msg_type': msg_type,
             'mmsi': mmsi,
@@ -58,22 +64,15 @@ def write_to_parquet(decoded_list, output_file):
             'speed': decoded.speed if msg_type in [1, 2, 3, 18] else None,
             'course': decoded.course if msg_type in [1, 2, 3, 18] else None,
             'vessel_name': getattr(decoded, 'name', 'N/A') if msg_type == 5 else None,
-            'ship_type': getattr(decoded, 'ship_type', 'N/A') if msg_type == 5 else None,
+            'ship_type': int(ship_type) if ship_type is not None else None,
             'timestamp': timestamp,
             'raw': raw
         }
         rows.append(row)
     
-    # Convert to DataFrame
-    df = pd.DataFrame(rows)
-    
-    # If file exists, append to it (using pandas read and concatenate)
-    if os.path.exists(output_file):
-        existing_df = pd.read_parquet(output_file)
-        df = pd.concat([existing_df, df], ignore_index=True)
-    
-    # Write to parquet
-    df.to_parquet(output_file, index=False)
+    # Buffered by the sink and written as MMSI-sorted row groups; the
+    # existing output is never read back
+    sink.write(rows)
 
 # Summarize decoded messages
 def summarize_decoded(decoded_list, section):
@@ -85,7 +84,7 @@ def summarize_decoded(decoded_list, section):
         mmsi = decoded.mmsi
         msg_types[msg_type] = msg_types.get(msg_type, 0) + 1
         mmsi_set.add(mmsi)
-        print(f"Type: {msg_type}, MMSI: {mmsi}, Raw: {raw.split(',2024-')[0]}")
+        print(f"Type: {msg_type}, MMSI: {mmsi}, Raw: {strip_timestamp(raw)}")
         if msg_type in [1, 2, 3, 18]:
             print(f"  Lat: {decoded.lat}, Lon: {decoded.lon}, Speed: {decoded.speed}")
         elif msg_type == 5:
@@ -95,36 +94,72 @@ def summarize_decoded(decoded_list, section):
 
 # Main processing
 filename = "20240911_06053.txt"
-output_file = "decoded_ais_data.parquet"
+output_dataset = "decoded_ais_data"  # Hive-partitioned by date and msg_type
 error_log_file = "ais_errors.txt"
-chunk_size = 2000  # Increased to reduce split multi-part messages
-multi_part_buffer = {}
+chunk_size = 2000  # Chunks never split a multi-part message
+batch_rows = 1000000  # Rows sorted by MMSI together before writing
+row_group_size = 100000
+compression = "snappy"
 error_log = []
+errors = ErrorAccounting()  # Counts by category; the lines go to error_log_file
+timestamp_parser = TimestampParser()
 
-with open(filename, 'r') as f:
-    lines = [line.strip() for line in f.readlines() if line.strip()]
-    total_lines = len(lines)
-    print(f"Total lines in file: {total_lines}")
-
-    all_decoded = []
-    for start in range(0, total_lines, chunk_size):
-        end = min(start + chunk_size, total_lines)
-        chunk = lines[start:end]
-        decoded_chunk, multi_part_buffer, error_log = process_chunk(chunk, multi_part_buffer, error_log)
-        all_decoded.extend(decoded_chunk)
-        write_to_parquet(decoded_chunk, output_file)
+# Rejected lines are counted by category and kept for error_log_file
+def reject(line, reason):
+    errors.record(reason, line)
+    error_log.append(line)
+
+def discard(lines, reason):
+    for line in lines:
+        reject(line, MALFORMED if reason == 'malformed' else ORPHAN_FRAGMENT)
+
+reassembler = Reassembler(on_discard=discard)
+# Junk lines are rejected from their fields and checksum before reassembly
+prefilter = Prefilter(on_reject=reject)
+
+with PartitionedSink(output_dataset, OUTPUT_SCHEMA, 'timestamp', batch_rows, row_group_size, compression) as sink:
+    file_size = os.path.getsize(filename)
+    bytes_read = 0
+    total_lines = 0
+
+    # Stream chunks, looking one ahead so the last chunk can be recognised
+    chunks = iter_chunks(read_lines(filename), chunk_size)
+    chunk = next(chunks, None)
+    first = True
+    middle_done = False
+    while chunk is not None:
+        next_chunk = next(chunks, None)
+        chunk_bytes = sum(len(line) + 1 for line in chunk)
+        decoded_chunk, reassembler, error_log = process_chunk(chunk, reassembler, error_log)
+        write_to_parquet(decoded_chunk, sink)
         
-        if start == 0:
+        if first:
             summarize_decoded(decoded_chunk[:min(30, len(decoded_chunk))], "First 30 Lines")
-        elif start <= total_lines // 2 < end:
-            middle_start = max(0, (total_lines // 2) - start - 5)
+            first = False
+        elif not middle_done and bytes_read + chunk_bytes >= file_size // 2:
+            middle = int(len(decoded_chunk) * (file_size // 2 - bytes_read) / chunk_bytes)
+            middle_start = max(0, middle - 5)
             middle_end = min(middle_start + 10, len(decoded_chunk))
             summarize_decoded(decoded_chunk[middle_start:middle_end], "Middle Sample")
-        if end == total_lines:
+            middle_done = True
+        if next_chunk is None:
             summarize_decoded(decoded_chunk[-min(20, len(decoded_chunk)):], "Last 20 Lines")
 
+        bytes_read += chunk_bytes
+        total_lines += len(chunk)
+        chunk = next_chunk
+
+print(f"Total lines in file: {total_lines}")
+
+# Fragments still waiting for their partners at end of file are errors too
+reassembler.flush()
+print(f"Prefilter: {dict(prefilter.stats)}")
+print(f"Reassembly: {reassembler.stats}")
+errors.print_summary()
+print(f"Unparseable timestamps: {timestamp_parser.unparseable}")
+
 # Write errors to log file
 with open(error_log_file, 'w') as f:
     f.write("\n".join(error_log))
 
-print(f"Decoding complete. Results saved to {output_file}. Errors logged to {error_log_file}")
\ No newline at end of file
+print(f"Decoding complete. Results saved to {output_dataset}/. Errors logged to {error_log_file}")
\ No newline at end of file
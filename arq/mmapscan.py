@@ -0,0 +1,202 @@
+"""Memory-mapped scanning of raw NMEA logs.
+
+The log is mapped with mmap and walked as bytes: sentence fields are located
+by offset with ``find`` and message type / MMSI pre-filters are evaluated
+from the first payload bytes through the armor table, so lines that fail a
+filter never become Python strings. Lines that pass are handed out as
+memoryview slices of the mapping.
+"""
+
+import argparse
+import mmap
+import os
+import sys
+from collections import namedtuple
+
+from fastdecode import ARMOR
+
+# line, talker, seq_id, channel, payload and timestamp are memoryviews into
+# the mapped file; they are only valid while the scanner is open
+Sentence = namedtuple('Sentence', [
+    'offset', 'line', 'talker', 'fragment_count', 'fragment_number',
+    'seq_id', 'channel', 'payload', 'timestamp',
+])
+
+
+def _armor(byte):
+    return ARMOR[byte] if byte < 128 else -1
+
+
+def payload_type(payload):
+    """Message type from the first byte of a payload, -1 if it is empty."""
+    if not len(payload):
+        return -1
+    return _armor(payload[0])
+
+
+def payload_mmsi(payload):
+    """MMSI (bits 8-37) from payload bytes 1-6, -1 if the payload is too short."""
+    if len(payload) < 7:
+        return -1
+    value = 0
+    for index in range(1, 7):
+        value = (value << 6) | (_armor(payload[index]) & 0x3F)
+    return (value >> 4) & 0x3FFFFFFF
+
+
+class LogScanner:
+    """Iterate over the sentences of a log file without copying it."""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        try:
+            if os.fstat(self.file.fileno()).st_size:
+                self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.mm = b''  # An empty file cannot be mapped; bytes scans the same way
+            self.view = memoryview(self.mm)
+        except BaseException:
+            self.file.close()
+            raise
+
+    def close(self):
+        """Release the mapping; views handed out earlier must be dropped first."""
+        try:
+            self.view.release()
+            if isinstance(self.mm, mmap.mmap):
+                self.mm.close()
+        except BufferError:
+            # Views are still referenced (e.g. by an aborted generator); the
+            # mapping is unmapped when they are garbage collected
+            pass
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def scan(self, msg_types=None, mmsi=None, start=0, end=None):
+        """Yield a Sentence for every line passing the optional filters.
+
+        msg_types and mmsi are collections of accepted values (or None for
+        no filter). Continuation fragments of a multipart message follow the
+        decision made for its first fragment. start and end limit the scan to
+        a line-aligned byte range.
+        """
+        if isinstance(mmsi, int):
+            mmsi = {mmsi}
+        msg_types = set(msg_types) if msg_types is not None else None
+        filtered = msg_types is not None or mmsi is not None
+        open_groups = {}  # (seq id, channel, count) -> first fragment passed
+
+        mm = self.mm
+        view = self.view
+        find = mm.find
+        size = len(mm) if end is None else end
+        pos = start
+        while pos < size:
+            newline = find(b'\n', pos, size)
+            if newline == -1:
+                newline = size
+            line_start, line_end, pos = pos, newline, newline + 1
+            if line_end > line_start and mm[line_end - 1] == 13:  # '\r'
+                line_end -= 1
+
+            # Offsets of the first seven commas
+            commas = []
+            cursor = line_start
+            while len(commas) < 7:
+                cursor = find(b',', cursor, line_end)
+                if cursor == -1:
+                    break
+                commas.append(cursor)
+                cursor += 1
+            if len(commas) < 6 or mm[line_start] != 33:  # '!'
+                continue
+
+            count = mm[commas[0] + 1] - 48
+            number = mm[commas[1] + 1] - 48
+            payload_start, payload_end = commas[4] + 1, commas[5]
+
+            if filtered:
+                key = (mm[commas[2] + 1:commas[3]], mm[commas[3] + 1:commas[4]], count)
+                if number > 1:
+                    if not open_groups.get(key):
+                        continue
+                else:
+                    passed = True
+                    payload = view[payload_start:payload_end]
+                    if msg_types is not None:
+                        passed = payload_type(payload) in msg_types
+                    if passed and mmsi is not None:
+                        passed = payload_mmsi(payload) in mmsi
+                    if count > 1:
+                        open_groups[key] = passed
+                    if not passed:
+                        continue
+
+            timestamp = view[commas[6] + 1:line_end] if len(commas) == 7 else None
+            yield Sentence(
+                line_start,
+                view[line_start:line_end],
+                view[line_start + 1:commas[0]],
+                count,
+                number,
+                view[commas[2] + 1:commas[3]],
+                view[commas[3] + 1:commas[4]],
+                view[payload_start:payload_end],
+                timestamp,
+            )
+
+    def message_types(self):
+        """Yield the message type of every first fragment with a payload."""
+        mm = self.mm
+        find = mm.find
+        size = len(mm)
+        pos = 0
+        while pos < size:
+            end = find(b'\n', pos)
+            if end == -1:
+                end = size
+            line_start, pos = pos, end + 1
+
+            commas = []
+            cursor = line_start
+            while len(commas) < 5:
+                cursor = find(b',', cursor, end)
+                if cursor == -1:
+                    break
+                commas.append(cursor)
+                cursor += 1
+            # Only first fragments carry the message type
+            if len(commas) < 5 or mm[line_start] != 33 or mm[commas[1] + 1] != 49:
+                continue
+            msg_type = _armor(mm[commas[4] + 1]) if commas[4] + 1 < end else -1
+            if msg_type >= 0:  # An empty payload reads as ',' which is not armor
+                yield msg_type
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scan a raw AIS log with pre-filters')
+    parser.add_argument('file', help='NMEA log file')
+    parser.add_argument('--type', '-t', type=int, action='append', help='Keep this message type (repeatable)')
+    parser.add_argument('--mmsi', '-m', type=int, action='append', help='Keep this MMSI (repeatable)')
+    parser.add_argument('--count', '-c', action='store_true', help='Only print the number of matching lines')
+    args = parser.parse_args()
+
+    matches = 0
+    with LogScanner(args.file) as scanner:
+        for sentence in scanner.scan(args.type, args.mmsi):
+            matches += 1
+            if not args.count:
+                sys.stdout.buffer.write(sentence.line)
+                sys.stdout.buffer.write(b'\n')
+        sentence = None  # Drop the last view before the mapping is closed
+    if args.count:
+        print(matches)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Multi-core decoding of large NMEA logs.
+
+The input file is split into byte-range shards that start on a line which
+begins a message (never on a continuation fragment), each shard is decoded
+to columns by a ProcessPoolExecutor worker, and the per-shard columns are
+merged and ordered by receiver timestamp.
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from columnar import GROUPS, decode_columns, to_dataframes, to_record_batches
+from linereader import read_lines, iter_chunks
+from timestamps import NAT
+
+
+def _is_continuation(line):
+    """True if a raw line is fragment 2..n of a multipart message."""
+    parts = line.split(b',', 3)
+    return len(parts) > 3 and parts[2].strip() not in (b'', b'1')
+
+
+def shard_boundaries(path, shards):
+    """Return [(start, end), ...] byte ranges covering the file.
+
+    Every range starts at the beginning of a line, and that line is skipped
+    forward past continuation fragments so a multipart message is never
+    split between two shards.
+    """
+    size = os.path.getsize(path)
+    starts = [0]
+    with open(path, 'rb') as f:
+        for i in range(1, shards):
+            f.seek(max(size * i // shards, starts[-1]))
+            if f.tell() > 0:
+                f.readline()  # Finish the line we landed in
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line or not _is_continuation(line):
+                    break
+            if offset > starts[-1]:
+                starts.append(offset)
+    return [(start, end) for start, end in zip(starts, starts[1:] + [size])]
+
+
+def decode_shard(path, start, end, groups=None, block_size=100000):
+    """Decode one byte range of a log to {group: {column: array}}."""
+    blocks = []
+    for chunk in iter_chunks(read_lines(path, start=start, end=end), block_size):
+        blocks.append(decode_columns(chunk, groups))
+    return concat_columns(blocks, groups)
+
+
+def concat_columns(blocks, groups=None):
+    """Concatenate a list of decode_columns results group by group."""
+    groups = groups or list(GROUPS)
+    merged = {}
+    for group in groups:
+        parts = [block[group] for block in blocks if group in block]
+        if not parts:
+            continue
+        merged[group] = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    return merged
+
+
+def _time_order(times):
+    """Stable order of rows by receiver timestamp; rows without one go last."""
+    keys = np.where(times == NAT, np.iinfo(np.int64).max, times)
+    return np.argsort(keys, kind='stable')
+
+
+def sort_by_time(columns):
+    """Reorder every group's columns by receiver timestamp."""
+    ordered = {}
+    for group, cols in columns.items():
+        order = _time_order(cols['time'])
+        ordered[group] = {name: values[order] for name, values in cols.items()}
+    return ordered
+
+
+def decode_parallel(path, workers=None, groups=None, output='pandas', shards_per_worker=4):
+    """Decode a log on several cores; returns DataFrames or RecordBatches per group."""
+    workers = workers or os.cpu_count() or 1
+    boundaries = shard_boundaries(path, workers * shards_per_worker)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(decode_shard, path, start, end, groups) for start, end in boundaries]
+        # Shards are collected in file order before the timestamp sort
+        results = [future.result() for future in futures]
+    columns = sort_by_time(concat_columns(results, groups))
+    if output == 'arrow':
+        return to_record_batches(columns)
+    return to_dataframes(columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Decode an AIS log on multiple cores')
+    parser.add_argument('input', help='NMEA log file')
+    parser.add_argument('--workers', '-w', type=int, help='Worker processes (default: all cores)')
+    parser.add_argument('--output', '-o', help='Output prefix (default: input name without extension)')
+    args = parser.parse_args()
+
+    prefix = args.output or os.path.splitext(args.input)[0]
+    batches = decode_parallel(args.input, args.workers, output='arrow')
+    for group, batch in batches.items():
+        output_file = f"{prefix}_{group}.parquet"
+        pq.write_table(pa.Table.from_batches([batch]), output_file)
+        print(f"{group}: {batch.num_rows} rows -> {output_file}")
+
+
+if __name__ == "__main__":
+    main()
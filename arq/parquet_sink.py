@@ -0,0 +1,77 @@
+"""Append-only Parquet output backed by a long-lived ParquetWriter.
+
+Each write is converted to the sink's fixed schema and buffered until a full
+row group is available, so ingesting a file costs one pass over the data
+instead of re-reading and rewriting the output for every chunk.
+"""
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+def to_table(data, schema):
+    """Convert row dicts, a DataFrame, a RecordBatch or a Table to schema."""
+    if isinstance(data, pa.Table):
+        return data.select(schema.names).cast(schema)
+    if isinstance(data, pa.RecordBatch):
+        return pa.Table.from_batches([data]).select(schema.names).cast(schema)
+    if isinstance(data, pd.DataFrame):
+        return pa.Table.from_pandas(data, schema=schema, preserve_index=False)
+    return pa.Table.from_pylist(list(data), schema=schema)
+
+
+class ParquetSink:
+    """Write rows, DataFrames or Arrow data to a Parquet file in row groups."""
+
+    def __init__(self, path, schema, row_group_size=100000, compression='snappy'):
+        self.path = path
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.writer = pq.ParquetWriter(path, schema, compression=compression)
+        self.pending = []
+        self.pending_rows = 0
+        self.rows_written = 0
+        self.row_groups_written = 0
+
+    def write(self, data):
+        """Buffer a list of row dicts, a DataFrame, a RecordBatch or a Table."""
+        table = to_table(data, self.schema)
+        if table.num_rows == 0:
+            return
+        self.pending.append(table)
+        self.pending_rows += table.num_rows
+        if self.pending_rows >= self.row_group_size:
+            self._write_pending(full_groups_only=True)
+
+    def _write_pending(self, full_groups_only=False):
+        if not self.pending:
+            return
+        table = pa.concat_tables(self.pending)
+        size = self.row_group_size
+        count = (table.num_rows // size) * size if full_groups_only else table.num_rows
+        if count:
+            self.writer.write_table(table.slice(0, count), row_group_size=size)
+            self.rows_written += count
+            self.row_groups_written += -(-count // size)
+        rest = table.slice(count)
+        self.pending = [rest] if rest.num_rows else []
+        self.pending_rows = rest.num_rows
+
+    def flush(self):
+        """Write buffered rows as a (possibly short) row group."""
+        self._write_pending()
+
+    def close(self):
+        """Flush and close the underlying writer."""
+        if self.writer is None:
+            return
+        self.flush()
+        self.writer.close()
+        self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
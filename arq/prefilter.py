@@ -0,0 +1,107 @@
+"""Cheap validation of NMEA lines before they are reassembled or decoded.
+
+``Prefilter`` looks only at the sentence fields, the ``*hh`` checksum and
+the first seven payload characters. It rejects lines with the wrong number
+of fields, empty payloads and bad checksums, and can keep only some message
+types or an MMSI range, all without de-armoring a payload. Junk never
+reaches the decoder, so the decoder neither attempts it nor raises and
+handles an exception for it. Continuation fragments of a multipart message
+follow the decision made for its first fragment, as in mmapscan.
+"""
+
+from collections import Counter
+from functools import reduce
+from operator import xor
+
+from errors import BAD_CHECKSUM, EMPTY_PAYLOAD, MALFORMED
+from mmapscan import payload_mmsi, payload_type
+from reassembly import split_sentence
+
+FILTERED = 'filtered'  # Valid, but not a wanted message type or MMSI
+
+
+def nmea_checksum(body):
+    """XOR of the characters between '!' and '*'."""
+    return reduce(xor, body.encode('ascii', 'replace'), 0)
+
+
+def verify_checksum(sentence):
+    """True if a sentence (without the receiver timestamp) matches its *hh checksum."""
+    star = sentence.rfind('*')
+    if star < 1:
+        return False
+    try:
+        expected = int(sentence[star + 1:star + 3], 16)
+    except ValueError:
+        return False
+    return nmea_checksum(sentence[1:star]) == expected
+
+
+class Prefilter:
+    """Accept or reject log lines from their header fields alone.
+
+    msg_types is a collection of accepted message types and mmsi_range an
+    inclusive (low, high) pair; None disables either filter. on_reject is
+    called as on_reject(line, reason) for rejected lines, where reason is an
+    errors category or FILTERED.
+    """
+
+    def __init__(self, msg_types=None, mmsi_range=None, check_checksum=True, on_reject=None):
+        self.msg_types = set(msg_types) if msg_types is not None else None
+        self.mmsi_range = mmsi_range
+        self.check_checksum = check_checksum
+        self.on_reject = on_reject
+        self.open_groups = {}  # (seq id, channel, count) -> first fragment passed
+        self.stats = Counter()
+
+    def check(self, line):
+        """Return None if line passes, else the reason it is rejected."""
+        fields, _ = split_sentence(line)
+        if len(fields) < 7 or not fields[0].startswith('!'):
+            return MALFORMED
+        try:
+            count = int(fields[1])
+            number = int(fields[2])
+        except ValueError:
+            return MALFORMED
+        payload = fields[5]
+        if not payload:
+            return EMPTY_PAYLOAD
+        if self.check_checksum and not verify_checksum(','.join(fields)):
+            return BAD_CHECKSUM
+        if self.msg_types is None and self.mmsi_range is None:
+            return None
+
+        key = (fields[3], fields[4], count)
+        if number > 1:
+            passed = self.open_groups.get(key, False)
+            if number == count:
+                self.open_groups.pop(key, None)
+            return None if passed else FILTERED
+
+        header = payload[:7].encode('ascii', 'replace')
+        passed = self.msg_types is None or payload_type(header) in self.msg_types
+        if passed and self.mmsi_range is not None:
+            low, high = self.mmsi_range
+            passed = low <= payload_mmsi(header) <= high
+        if count > 1:
+            self.open_groups[key] = passed
+        return None if passed else FILTERED
+
+    def accept(self, line):
+        """True if line passes; rejections are counted and reported."""
+        reason = self.check(line)
+        if reason is None:
+            self.stats['passed'] += 1
+            return True
+        self.stats[reason] += 1
+        if self.on_reject:
+            self.on_reject(line, reason)
+        return False
+
+    def filter(self, lines):
+        """Yield the lines that pass."""
+        accept = self.accept
+        for line in lines:
+            if accept(line):
+                yield line
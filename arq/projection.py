@@ -0,0 +1,119 @@
+"""Decoding of only the fields a pipeline uses.
+
+A ``Projection`` is built from the columns a caller needs, each naming a
+layout key from fastdecode. For every message type it compiles a layout of
+just those fields, so decoding reads only their bit ranges and de-armors
+only the payload characters up to the last of them. Types with none of the
+requested fields, or outside ``msg_types``, are rejected from their first
+character without de-armoring anything; for type 24 the part number is read
+first and a part without requested fields is rejected the same way.
+
+Characters past the last requested field are never read, so they are not
+checked against the armor alphabet either.
+"""
+
+from fastdecode import (
+    CLASS_B_STATIC_PARTS,
+    LAYOUTS,
+    compile_layout,
+    extract_fields,
+    message_type,
+    required_bits,
+    try_dearmor,
+)
+from records import Status
+
+PART_NUMBER_BITS = 40  # Type 24 header: type, repeat, MMSI and the 2-bit part number
+AIS_TYPES = range(1, 28)  # Message types defined by ITU-R M.1371
+
+
+class Projection:
+    """Decode the requested columns of a payload into a dict.
+
+    columns maps an output name to a layout key, or to (layout key, convert)
+    to replace the layout's converter; convert receives the raw (sign
+    extended) integer. msg_types limits the message types decoded.
+    """
+
+    def __init__(self, columns, msg_types=None):
+        self.columns = {
+            name: spec if isinstance(spec, tuple) else (spec, None)
+            for name, spec in columns.items()
+        }
+        self.plans = {}  # msg_type -> (characters, compiled), or {part: (characters, compiled)} for 24
+        for msg_type, (_, layout) in LAYOUTS.items():
+            if msg_types is not None and msg_type not in msg_types:
+                continue
+            if msg_type == 24:
+                parts = {}
+                for part, part_layout in CLASS_B_STATIC_PARTS.items():
+                    plan = self._compile(part_layout)
+                    if plan is not None:
+                        parts[part] = plan
+                if parts:
+                    self.plans[24] = parts
+            else:
+                plan = self._compile(layout)
+                if plan is not None:
+                    self.plans[msg_type] = plan
+        # Minimum payload bits per type (per part for 24), for errors.check_bit_length
+        self.min_bits = {
+            msg_type: {part: required_bits(compiled) for part, (_, compiled) in plan.items()}
+            if msg_type == 24 else required_bits(plan[1])
+            for msg_type, plan in self.plans.items()
+        }
+
+    def _compile(self, layout):
+        """(characters to de-armor, compiled fields) for the requested fields of a layout."""
+        projected = []
+        for name, (key, convert) in self.columns.items():
+            for field_key, start, width, kind, field_convert in layout:
+                if field_key == key:
+                    projected.append((name, start, width, kind, convert or field_convert))
+                    break
+        if not projected:
+            return None
+        length, fields = compile_layout(projected)
+        return -(-length // 6), (length, fields)
+
+    def try_decode(self, payload):
+        """Return (status, row, message) like records.try_decode_record.
+
+        row holds msg_type and the columns the message's type provides.
+        AIS types that are outside msg_types or provide none of them come
+        back as Status.FILTERED; only codes that are not AIS types are
+        Status.UNSUPPORTED_TYPE.
+
+        >>> projection = Projection({'mmsi': 'mmsi'}, msg_types=(1, 2, 3))
+        >>> projection.try_decode('85Mwp`1Kf3aCnsNvBWLi=wQuNhA5t43N`5nCuI=p<IBfVqnROQ')[0]
+        <Status.FILTERED: 'filtered'>
+        >>> projection.try_decode('15M67FC000G?ufbE`FepT@3n00Sa')[:2]
+        (<Status.OK: 'ok'>, {'msg_type': 1, 'mmsi': 366053209})
+        """
+        if not payload:
+            return Status.EMPTY_PAYLOAD, None, "Empty payload"
+        msg_type = message_type(payload)
+        plan = self.plans.get(msg_type)
+        if plan is None:
+            if msg_type in AIS_TYPES:
+                return Status.FILTERED, None, None
+            return Status.UNSUPPORTED_TYPE, None, f"Unsupported message type: {msg_type}"
+
+        if msg_type == 24:
+            dearmored = try_dearmor(payload[:-(-PART_NUMBER_BITS // 6)])
+            if dearmored is None:
+                return Status.MALFORMED, None, "Invalid character in payload"
+            value, bit_count = dearmored
+            part = (value >> (bit_count - PART_NUMBER_BITS)) & 0x3 if bit_count >= PART_NUMBER_BITS else 0
+            plan = plan.get(part)
+            if plan is None:
+                return Status.FILTERED, None, None
+
+        characters, compiled = plan
+        dearmored = try_dearmor(payload[:characters])
+        if dearmored is None:
+            return Status.MALFORMED, None, "Invalid character in payload"
+        value, bit_count = dearmored
+        row = {'msg_type': msg_type}
+        extract_fields(value, bit_count, compiled, row)
+        return Status.OK, row, None
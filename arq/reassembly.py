@@ -0,0 +1,139 @@
+"""Streaming reassembly of multipart AIVDM sentences.
+
+Fragments are grouped by (sequence id, channel, fragment count), so
+interleaved groups, out-of-order fragments and messages with any number of
+fragments are stitched together regardless of what arrives in between. Incomplete groups are
+expired once they are older than ``max_age`` sentences or when more than
+``max_pending`` groups are open, which keeps memory flat on long feeds.
+"""
+
+from collections import OrderedDict, namedtuple
+
+# sentences: the NMEA sentences without the receiver timestamp, in fragment order
+# payload: the joined armored payload
+Message = namedtuple('Message', ['sentences', 'payload', 'fill_bits', 'channel', 'timestamp'])
+
+
+def split_sentence(line):
+    """Split a log line into (sentence fields, receiver timestamp or None)."""
+    parts = line.rstrip('\r\n').split(',')
+    if len(parts) > 7:
+        return parts[:7], ','.join(parts[7:]).strip()
+    return parts, None
+
+
+def raw_line(message):
+    """Rebuild a single log line for a message, joining fragments with ' + '."""
+    raw = ' + '.join(message.sentences)
+    if message.timestamp:
+        raw += ',' + message.timestamp
+    return raw
+
+
+class Reassembler:
+    """Turn a stream of log lines into complete messages."""
+
+    def __init__(self, max_pending=100, max_age=1000, on_discard=None):
+        self.max_pending = max_pending
+        self.max_age = max_age
+        self.on_discard = on_discard
+        self.pending = OrderedDict()  # key -> (first sentence index, fragments)
+        self.clock = 0
+        self.stats = {
+            'sentences': 0,
+            'messages': 0,
+            'multipart': 0,
+            'malformed': 0,
+            'expired': 0,
+            'dropped': 0,
+        }
+
+    def _discard(self, lines, reason):
+        self.stats[reason] += len(lines)
+        if self.on_discard:
+            self.on_discard(lines, reason)
+
+    def _expire(self):
+        while self.pending:
+            key, (started, fragments) = next(iter(self.pending.items()))
+            if self.clock - started <= self.max_age and len(self.pending) <= self.max_pending:
+                break
+            del self.pending[key]
+            self._discard([line for line, _ in fragments.values()], 'expired')
+
+    def feed(self, line):
+        """Add one log line; return the completed Message or None."""
+        self.clock += 1
+        self.stats['sentences'] += 1
+        if self.pending:
+            self._expire()
+        fields, timestamp = split_sentence(line)
+        try:
+            if len(fields) < 7 or not fields[0].startswith('!'):
+                raise ValueError
+            count = int(fields[1])
+            number = int(fields[2])
+            if not 1 <= number <= count:
+                raise ValueError
+        except ValueError:
+            self._discard([line], 'malformed')
+            return None
+
+        sentence = ','.join(fields)
+        channel = fields[4]
+
+        if count == 1:
+            self.stats['messages'] += 1
+            return Message([sentence], fields[5], fields[6].split('*')[0], channel, timestamp)
+
+        # Fragments may arrive in any order; the group opens on whichever comes first
+        key = (fields[3], channel, count)
+        entry = self.pending.get(key)
+        if entry is not None and number in entry[1]:
+            # Sequence id reused before the previous group completed
+            del self.pending[key]
+            self._discard([raw for raw, _ in entry[1].values()], 'dropped')
+            entry = None
+        if entry is None:
+            entry = (self.clock, {})
+            self.pending[key] = entry
+
+        fragments = entry[1]
+        fragments[number] = (line, fields)
+        if len(fragments) < count:
+            self._expire()
+            return None
+
+        del self.pending[key]
+        ordered = [fragments[n][1] for n in range(1, count + 1)]
+        self.stats['messages'] += 1
+        self.stats['multipart'] += 1
+        return Message(
+            [','.join(parts) for parts in ordered],
+            ''.join(parts[5] for parts in ordered),
+            ordered[-1][6].split('*')[0],
+            channel,
+            timestamp,
+        )
+
+    def process(self, lines):
+        """Yield complete Messages from an iterable of log lines."""
+        for line in lines:
+            if not line.strip():
+                continue
+            message = self.feed(line)
+            if message is not None:
+                yield message
+
+    def flush(self):
+        """Expire every incomplete group, e.g. at the end of a file."""
+        while self.pending:
+            _, (_, fragments) = self.pending.popitem(last=False)
+            self._discard([line for line, _ in fragments.values()], 'expired')
+
+
+def reassemble(lines, **kwargs):
+    """Yield complete Messages from lines with a fresh Reassembler."""
+    reassembler = Reassembler(**kwargs)
+    yield from reassembler.process(lines)
+    reassembler.flush()
@@ -0,0 +1,169 @@
+"""Compact message records for the pure-Python decoders.
+
+``decode_record`` decodes a payload like ``fastdecode.decode_payload`` but
+returns a ``__slots__`` record instead of a dict: one small object per
+message with no per-instance key storage, and the message description kept
+once per class as an interned string. Records are Mappings over their set
+fields (plus item assignment), so existing ``msg['mmsi']``,
+``'latitude' in msg`` and ``msg.get(...)`` code keeps working; ``to_dict``
+gives the plain dict.
+
+``try_decode_record`` is the form for decode loops: it reports empty and
+malformed payloads as a ``Status`` with a message instead of raising, so a
+dirty feed costs a comparison per bad message rather than an exception.
+``decode_record`` raises ValueError for the same cases.
+"""
+
+import sys
+from collections.abc import Mapping
+from enum import Enum
+
+from fastdecode import (
+    LAYOUTS,
+    COMPILED,
+    COMPILED_CLASS_B_STATIC,
+    CLASS_B_STATIC_PARTS,
+    extract_fields,
+    try_dearmor,
+)
+
+
+class Record(Mapping):
+    """Base class for decoded messages; fields are slots, unset ones are absent."""
+
+    __slots__ = ()
+    _fields = ()
+
+    def __getitem__(self, key):
+        if key not in self._fields:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        # Used by fastdecode.extract_fields and for the receiver timestamp
+        setattr(self, key, value)
+
+    def __iter__(self):
+        for key in self._fields:
+            if hasattr(self, key):
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def to_dict(self):
+        """Return the fields as a plain dict, in decoder order."""
+        return {key: getattr(self, key) for key in self}
+
+    def __repr__(self):
+        fields = ', '.join(f"{key}={getattr(self, key)!r}" for key in self if key != 'msg_description')
+        return f"{type(self).__name__}({fields})"
+
+
+class UnsupportedMessage(Record):
+    """A message type without a layout; carries the payload bits."""
+
+    __slots__ = ('msg_type', 'raw', 'decoded', 'timestamp')
+    _fields = __slots__
+
+    def __init__(self, msg_type, raw, decoded):
+        self.msg_type = msg_type
+        self.raw = raw
+        self.decoded = decoded
+
+
+def _record_class(name, msg_type, extra_layouts=()):
+    """Build a Record subclass with one slot per field of the type's layouts."""
+    description, layout = LAYOUTS[msg_type]
+    keys = ['msg_type']
+    for fields in (layout,) + tuple(extra_layouts):
+        keys.extend(key for key, _, _, _, _ in fields if key not in keys)
+    if 'timestamp' not in keys:
+        keys.append('timestamp')  # Receiver timestamp added by decode_ais
+    slots = tuple(keys)
+    namespace = {
+        '__slots__': slots,
+        '_fields': ('msg_type', 'msg_description') + slots[1:],
+        'msg_description': sys.intern(description),
+    }
+    return type(name, (Record,), namespace)
+
+
+PositionReport = _record_class('PositionReport', 1)
+BaseStationReport = _record_class('BaseStationReport', 4)
+StaticData = _record_class('StaticData', 5)
+ClassBPosition = _record_class('ClassBPosition', 18)
+ExtendedClassB = _record_class('ExtendedClassB', 19)
+AidToNavigation = _record_class('AidToNavigation', 21)
+ClassBStatic = _record_class('ClassBStatic', 24, CLASS_B_STATIC_PARTS.values())
+LongRangePosition = _record_class('LongRangePosition', 27)
+
+# Message type -> record class
+RECORD_CLASSES = {
+    1: PositionReport,
+    2: PositionReport,
+    3: PositionReport,
+    4: BaseStationReport,
+    5: StaticData,
+    18: ClassBPosition,
+    19: ExtendedClassB,
+    21: AidToNavigation,
+    24: ClassBStatic,
+    27: LongRangePosition,
+}
+
+
+class Status(Enum):
+    """Outcome of try_decode_record; the values are errors categories."""
+
+    OK = 'ok'
+    EMPTY_PAYLOAD = 'empty_payload'
+    MALFORMED = 'malformed'  # Characters outside the armor alphabet
+    UNSUPPORTED_TYPE = 'unsupported_type'
+    FILTERED = 'filtered'  # Valid, but outside what the caller asked for (see projection)
+
+
+def try_decode_record(payload):
+    """Decode an armored payload without raising for bad input.
+
+    Returns (status, record, message). record is None for an empty or
+    malformed payload, with message saying why; an unsupported type comes
+    back as its UnsupportedMessage record.
+    """
+    if not payload:
+        return Status.EMPTY_PAYLOAD, None, "Empty payload"
+    dearmored = try_dearmor(payload)
+    if dearmored is None:
+        return Status.MALFORMED, None, "Invalid character in payload"
+    value, bit_count = dearmored
+    msg_type = value >> (bit_count - 6)
+
+    cls = RECORD_CLASSES.get(msg_type)
+    if cls is None:
+        message = sys.intern(f"Unsupported message type: {msg_type}")
+        record = UnsupportedMessage(msg_type, format(value, f'0{bit_count}b'), message)
+        return Status.UNSUPPORTED_TYPE, record, message
+
+    record = cls()
+    record.msg_type = msg_type
+    extract_fields(value, bit_count, COMPILED[msg_type], record)
+
+    if msg_type == 24:
+        compiled = COMPILED_CLASS_B_STATIC.get(record.part_number)
+        if compiled:
+            extract_fields(value, bit_count, compiled, record)
+    return Status.OK, record, None
+
+
+def decode_record(payload):
+    """Decode an armored payload into a Record (see fastdecode.decode_payload).
+
+    Raises ValueError for an empty or malformed payload.
+    """
+    status, record, message = try_decode_record(payload)
+    if record is None:
+        raise ValueError(message)
+    return record
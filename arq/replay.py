@@ -0,0 +1,90 @@
+"""Replay an NMEA log to an ingest server at N times real-time speed.
+
+Lines are paced by their receiver timestamps: a line stamped t seconds
+after the first one is sent t / speed seconds after the replay starts, so
+the burstiness of the original feed is preserved. Lines without a
+timestamp go out with the line before them. Sends over UDP (one datagram
+per line, as receivers do) or TCP. Unthrottled UDP can overrun the
+receiver's socket buffer, which shows up as lost lines; TCP never loses
+lines and is throttled by the server instead.
+"""
+
+import argparse
+import asyncio
+import time
+
+from ingest import DEFAULT_PORT
+from linereader import read_lines
+from timestamps import TimestampParser, extract_timestamp
+
+
+class _UDPSender(asyncio.DatagramProtocol):
+
+    def error_received(self, exc):
+        pass  # e.g. ICMP port unreachable while the server is not up yet
+
+
+async def replay(path, host='127.0.0.1', port=DEFAULT_PORT, protocol='udp', speed=1.0, loops=1):
+    """Send the lines of path to host:port; returns (lines sent, seconds).
+
+    speed is the replay factor (10 = ten times faster than recorded); 0
+    sends as fast as possible. loops repeats the file.
+    """
+    loop = asyncio.get_running_loop()
+    if protocol == 'udp':
+        transport, _ = await loop.create_datagram_endpoint(_UDPSender, remote_addr=(host, port))
+        writer = None
+    else:
+        _, writer = await asyncio.open_connection(host, port)
+        transport = None
+
+    parse_time = TimestampParser().parse
+    sent = 0
+    started = time.perf_counter()
+    try:
+        for _ in range(loops):
+            first = None
+            loop_started = time.perf_counter()
+            for line in read_lines(path):
+                if speed > 0:
+                    stamp = parse_time(extract_timestamp(line))
+                    if stamp is not None:
+                        if first is None:
+                            first = stamp
+                        delay = loop_started + (stamp - first) / speed - time.perf_counter()
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+                data = line.encode('ascii', 'replace') + b'\r\n'
+                if transport is not None:
+                    transport.sendto(data)
+                    if sent % 64 == 0:
+                        await asyncio.sleep(0)  # Give a same-process receiver a turn
+                else:
+                    writer.write(data)
+                    await writer.drain()
+                sent += 1
+    finally:
+        if transport is not None:
+            transport.close()
+        else:
+            writer.close()
+            await writer.wait_closed()
+    return sent, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay an NMEA log to an ingest server')
+    parser.add_argument('file', help='NMEA log file with receiver timestamps')
+    parser.add_argument('--host', default='127.0.0.1', help='Server address')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Server port (default: {DEFAULT_PORT})')
+    parser.add_argument('--protocol', choices=['udp', 'tcp'], default='udp', help='Transport (default: udp)')
+    parser.add_argument('--speed', '-s', type=float, default=1.0, help='Replay speed factor, 0 for unthrottled (default: 1)')
+    parser.add_argument('--loops', type=int, default=1, help='Times to replay the file')
+    args = parser.parse_args()
+
+    sent, elapsed = asyncio.run(replay(args.file, args.host, args.port, args.protocol, args.speed, args.loops))
+    print(f"Sent {sent} lines in {elapsed:.1f} s ({sent / elapsed:,.0f} lines/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Grid index over decoded positions for bounding-box and radius queries.
+
+Positions are bucketed into fixed lat/lon cells and the row numbers are
+stored sorted by cell key (row-major: cell row * columns + cell column), so
+the cells of one grid row inside a query box form a single contiguous slice
+found with ``searchsorted``. A query touches only the candidate rows in the
+covered cells and then filters them exactly, instead of scanning the whole
+table. The index is saved next to the Parquet file it was built from
+(``<file>.spatial.npz``) and rebuilt when that file changes.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+from timestamps import NAT, parse_column
+
+EARTH_RADIUS_NM = 3440.065
+DEFAULT_CELL_SIZE = 0.1  # degrees, about 6 nm of latitude
+
+# (latitude, longitude) column names used by the different outputs
+COORDINATE_COLUMNS = [('lat', 'lon'), ('latitude', 'longitude')]
+TIME_COLUMNS = ['time', 'timestamp', 'last_updated']
+
+
+def coordinate_columns(df):
+    """Return the (lat, lon) column names present in df."""
+    for lat, lon in COORDINATE_COLUMNS:
+        if lat in df.columns and lon in df.columns:
+            return lat, lon
+    raise KeyError("No latitude/longitude columns found")
+
+
+def time_column(df):
+    """Return the name of df's receiver time column, or None."""
+    for name in TIME_COLUMNS:
+        if name in df.columns:
+            return name
+    return None
+
+
+def epoch_seconds(values):
+    """int64 epoch seconds (NAT when missing) for datetimes or timestamp strings."""
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        seconds = values.to_numpy(dtype='datetime64[s]').view(np.int64)
+        return np.where(values.isna().to_numpy(), NAT, seconds)
+    epochs, _ = parse_column(values.astype(object).where(values.notna(), None).to_numpy())
+    return epochs
+
+
+def haversine_nm(lat1, lon1, lat2, lon2):
+    """Great-circle distance in nautical miles (vectorized)."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_NM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GridIndex:
+    """Row numbers of a DataFrame bucketed by lat/lon grid cell."""
+
+    def __init__(self, cell_size, rows, lat, lon, time, cell_keys, cell_starts, signature=None):
+        self.cell_size = cell_size
+        self.columns = int(round(360 / cell_size))
+        self.rows = rows  # DataFrame row numbers, sorted by cell then time
+        self.lat = lat  # Coordinates and times in the same order as rows
+        self.lon = lon
+        self.time = time
+        self.cell_keys = cell_keys  # Sorted distinct cell keys
+        self.cell_starts = cell_starts  # Offset of each cell in rows, plus the end
+        self.signature = signature
+
+    @classmethod
+    def build(cls, df, cell_size=DEFAULT_CELL_SIZE, signature=None):
+        """Index the valid positions of df."""
+        lat_name, lon_name = coordinate_columns(df)
+        lat = pd.to_numeric(df[lat_name], errors='coerce').to_numpy(dtype=np.float64)
+        lon = pd.to_numeric(df[lon_name], errors='coerce').to_numpy(dtype=np.float64)
+        time_name = time_column(df)
+        time = epoch_seconds(df[time_name]) if time_name else np.full(len(df), NAT, dtype=np.int64)
+
+        with np.errstate(invalid='ignore'):
+            valid = (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+        rows = np.flatnonzero(valid)
+        keys = cls._cell_keys(lat[rows], lon[rows], cell_size)
+        order = np.lexsort((time[rows], keys))
+        rows, keys = rows[order], keys[order]
+
+        cell_keys, cell_starts = np.unique(keys, return_index=True)
+        cell_starts = np.append(cell_starts, len(keys)).astype(np.int64)
+        return cls(cell_size, rows, lat[rows], lon[rows], time[rows], cell_keys, cell_starts, signature)
+
+    @staticmethod
+    def _cell_keys(lat, lon, cell_size):
+        columns = int(round(360 / cell_size))
+        cell_rows = np.floor((lat + 90) / cell_size).astype(np.int64)
+        cell_columns = np.minimum(np.floor((lon + 180) / cell_size).astype(np.int64), columns - 1)
+        return cell_rows * columns + cell_columns
+
+    def save(self, path):
+        np.savez(
+            path,
+            cell_size=self.cell_size,
+            rows=self.rows,
+            lat=self.lat,
+            lon=self.lon,
+            time=self.time,
+            cell_keys=self.cell_keys,
+            cell_starts=self.cell_starts,
+            signature=np.array(self.signature or (0, 0), dtype=np.int64),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                float(data['cell_size']), data['rows'], data['lat'], data['lon'], data['time'],
+                data['cell_keys'], data['cell_starts'], tuple(data['signature'].tolist()),
+            )
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _candidates(self, min_lat, min_lon, max_lat, max_lon):
+        """Positions (into the sorted arrays) of every row in cells touching the box."""
+        size = self.cell_size
+        first_row = int(np.floor((max(min_lat, -90) + 90) / size))
+        last_row = int(np.floor((min(max_lat, 90) + 90) / size))
+        first_column = int(np.floor((max(min_lon, -180) + 180) / size))
+        last_column = min(int(np.floor((min(max_lon, 180) + 180) / size)), self.columns - 1)
+        slices = []
+        for cell_row in range(first_row, last_row + 1):
+            base = cell_row * self.columns
+            lo, hi = np.searchsorted(self.cell_keys, [base + first_column, base + last_column + 1])
+            if lo < hi:
+                slices.append(np.arange(self.cell_starts[lo], self.cell_starts[hi]))
+        if not slices:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(slices)
+
+    def _filter_time(self, positions, start, end):
+        if start is None and end is None:
+            return positions
+        times = self.time[positions]
+        keep = times != NAT
+        if start is not None:
+            keep &= times >= start
+        if end is not None:
+            keep &= times <= end
+        return positions[keep]
+
+    def bbox(self, min_lat, min_lon, max_lat, max_lon, start=None, end=None):
+        """Row numbers inside the box (and [start, end] epoch seconds), in cell order.
+
+        A box with min_lon > max_lon crosses the antimeridian.
+        """
+        if min_lon > max_lon:
+            west = self.bbox(min_lat, min_lon, max_lat, 180.0, start, end)
+            east = self.bbox(min_lat, -180.0, max_lat, max_lon, start, end)
+            return np.concatenate([west, east])
+        positions = self._candidates(min_lat, min_lon, max_lat, max_lon)
+        lat, lon = self.lat[positions], self.lon[positions]
+        inside = (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+        return self.rows[self._filter_time(positions[inside], start, end)]
+
+    def radius(self, lat, lon, radius_nm, start=None, end=None):
+        """Return (row numbers, distances in nm) of positions within radius_nm of a point."""
+        dlat = radius_nm / 60.0
+        coslat = np.cos(np.radians(min(abs(lat) + dlat, 90.0)))
+        dlon = 180.0 if coslat < 1e-9 else min(dlat / coslat, 180.0)
+        boxes = [(lon - dlon, lon + dlon)]
+        if lon - dlon < -180:
+            boxes = [(lon - dlon + 360, 180.0), (-180.0, lon + dlon)]
+        elif lon + dlon > 180:
+            boxes = [(lon - dlon, 180.0), (-180.0, lon + dlon - 360)]
+
+        positions = np.concatenate([
+            self._candidates(lat - dlat, west, lat + dlat, east) for west, east in boxes
+        ])
+        positions = self._filter_time(positions, start, end)
+        distance = haversine_nm(lat, lon, self.lat[positions], self.lon[positions])
+        inside = distance <= radius_nm
+        return self.rows[positions[inside]], distance[inside]
+
+
+def index_path(parquet_path):
+    # Next to the file, or next to (not inside) a dataset directory
+    return parquet_path.rstrip(os.sep) + '.spatial.npz'
+
+
+def file_signature(path):
+    """(size, mtime) of a file, stored with derived indexes to detect changes.
+
+    For a dataset directory the root's own size and mtime do not change when
+    partition files are rewritten, so the signature is (total size, hash of
+    every fragment's path, size and mtime).
+    """
+    if not os.path.isdir(path):
+        stat = os.stat(path)
+        return (stat.st_size, stat.st_mtime_ns)
+    digest = hashlib.blake2b(digest_size=8)
+    total = 0
+    for fragment in sorted(ds.dataset(path, format='parquet', partitioning='hive').files):
+        stat = os.stat(fragment)
+        total += stat.st_size
+        digest.update(f"{os.path.relpath(fragment, path)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return (total, int.from_bytes(digest.digest(), 'little', signed=True))
+
+
+def load_or_build(parquet_path, df, cell_size=DEFAULT_CELL_SIZE, rebuild=False):
+    """Return the index persisted next to parquet_path, building it if stale or missing."""
+    path = index_path(parquet_path)
+    signature = file_signature(parquet_path)
+    if not rebuild and os.path.exists(path):
+        index = GridIndex.load(path)
+        if index.signature == signature and index.cell_size == cell_size:
+            return index
+    index = GridIndex.build(df, cell_size, signature)
+    index.save(path)
+    return index
+
+
+def vessels_near(df, index, lat, lon, radius_nm, start=None, end=None):
+    """One row per MMSI within radius_nm of a point: its closest position."""
+    rows, distance = index.radius(lat, lon, radius_nm, start, end)
+    hits = df.iloc[rows].assign(distance_nm=distance)
+    return hits.sort_values('distance_nm', kind='stable').drop_duplicates('mmsi').reset_index(drop=True)
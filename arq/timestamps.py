@@ -0,0 +1,140 @@
+"""Parsing of the receiver timestamp appended to each log line.
+
+Log lines end with ',YYYY-MM-DD HH:MM:SS'. These helpers turn that suffix
+into int64 epoch seconds (UTC) for any year, either one value at a time with
+a cache (many consecutive lines share the same second and all share a few
+days) or for a whole column at once with NumPy arithmetic.
+"""
+
+from datetime import date
+
+import numpy as np
+
+# int64 value used for unparseable timestamps; it is NaT as datetime64
+NAT = np.iinfo(np.int64).min
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def extract_timestamp(line):
+    """Return the trailing timestamp field of a log line, or None.
+
+    A line without a timestamp ends with the checksum field ('0*26'), so the
+    last field only counts when it has no '*'. Accepts str or bytes.
+    """
+    if isinstance(line, (bytes, bytearray, memoryview)):
+        line = bytes(line).decode('ascii', 'replace')
+    head, sep, tail = line.rstrip().rpartition(',')
+    if not sep or '*' in tail:
+        return None
+    return tail.strip()
+
+
+def strip_timestamp(line):
+    """Return a log line without its trailing timestamp field."""
+    if extract_timestamp(line) is None:
+        return line
+    return line.rstrip().rpartition(',')[0]
+
+
+class TimestampParser:
+    """Parse 'YYYY-MM-DD HH:MM:SS' strings into epoch seconds with caching."""
+
+    def __init__(self):
+        self.days = {}  # 'YYYY-MM-DD' -> days since epoch
+        self.last_text = None
+        self.last_value = None
+        self.parsed = 0
+        self.unparseable = 0
+
+    def _day(self, text):
+        day = self.days.get(text)
+        if day is None:
+            day = date(int(text[0:4]), int(text[5:7]), int(text[8:10])).toordinal() - _EPOCH_ORDINAL
+            self.days[text] = day
+        return day
+
+    def parse(self, text):
+        """Epoch seconds for text, or None (counted in unparseable)."""
+        if text == self.last_text:
+            value = self.last_value
+        else:
+            value = None
+            if text and len(text) == 19 and text[4] == '-' and text[7] == '-' and text[13] == ':' and text[16] == ':':
+                try:
+                    hour, minute, second = int(text[11:13]), int(text[14:16]), int(text[17:19])
+                    if hour < 24 and minute < 60 and second < 60:
+                        value = self._day(text[:10]) * 86400 + hour * 3600 + minute * 60 + second
+                except ValueError:
+                    pass
+            self.last_text = text
+            self.last_value = value
+
+        if value is None:
+            self.unparseable += 1
+        else:
+            self.parsed += 1
+        return value
+
+
+def _digits(matrix, start, stop):
+    value = np.zeros(matrix.shape[0], dtype=np.int64)
+    for column in range(start, stop):
+        value = value * 10 + (matrix[:, column].astype(np.int64) - 48)
+    return value
+
+
+def _days_from_civil(year, month, day):
+    """Days since 1970-01-01 for proleptic Gregorian dates (vectorized)."""
+    year = year - (month <= 2)
+    era = np.floor_divide(year, 400)
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def parse_column(values):
+    """Parse a column of timestamp strings into (int64 epoch seconds, unparseable count).
+
+    Invalid or missing entries become NAT, which reads as NaT after
+    ``to_datetime64``.
+    """
+    # None/NaN pack as b'None'/b'nan' and fail validation like any other junk
+    try:
+        packed = np.asarray(values, dtype='S20')
+    except UnicodeEncodeError:
+        packed = np.array([str(v).encode('ascii', 'replace') for v in values], dtype='S20')
+    if len(packed) == 0:
+        return np.zeros(0, dtype=np.int64), 0
+
+    matrix = packed.view(np.uint8).reshape(len(packed), 20)
+    digit_columns = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+    digits = matrix[:, digit_columns]
+    valid = ((digits >= 48) & (digits <= 57)).all(axis=1)
+    valid &= (matrix[:, 4] == 45) & (matrix[:, 7] == 45)  # '-'
+    valid &= (matrix[:, 10] == 32) | (matrix[:, 10] == 84)  # ' ' or 'T'
+    valid &= (matrix[:, 13] == 58) & (matrix[:, 16] == 58)  # ':'
+    valid &= matrix[:, 19] == 0  # exactly 19 characters
+
+    year = _digits(matrix, 0, 4)
+    month = _digits(matrix, 5, 7)
+    day = _digits(matrix, 8, 10)
+    hour = _digits(matrix, 11, 13)
+    minute = _digits(matrix, 14, 16)
+    second = _digits(matrix, 17, 19)
+
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_days = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])[np.clip(month, 0, 12)]
+    month_days = month_days + (leap & (month == 2))
+    valid &= (month >= 1) & (month <= 12) & (day >= 1) & (day <= month_days)
+    valid &= (hour < 24) & (minute < 60) & (second < 60)
+
+    epoch = _days_from_civil(year, month, day) * 86400 + hour * 3600 + minute * 60 + second
+    epoch = np.where(valid, epoch, NAT)
+    return epoch, int((~valid).sum())
+
+
+def to_datetime64(epochs):
+    """View int64 epoch seconds (NAT for missing) as datetime64[s]."""
+    return np.asarray(epochs, dtype=np.int64).view('datetime64[s]')
@@ -0,0 +1,196 @@
+"""Vessel track resampling and simplification for plotting.
+
+A day of 2-10 second reports is tens of thousands of points per vessel,
+far more than a plot can show. ``simplify_track`` reduces a track in two
+steps: ``resample`` keeps the first position in every time interval, then
+Douglas-Peucker or Visvalingam-Whyatt ranks the remaining points by how much
+the line changes without them. The ranking is computed once per track, so a
+point budget (``max_points``) and an error tolerance are both a cheap cut of
+the same ranking. ``TrackCache`` keeps the prepared tracks per MMSI for
+repeated plots of the same vessel.
+
+Distances are in nautical miles on a local equirectangular projection,
+which is accurate enough for the size of a single track.
+"""
+
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from spatial import coordinate_columns, epoch_seconds, time_column
+
+METHODS = ('douglas-peucker', 'visvalingam', 'none')
+
+
+def _project(lat, lon):
+    """x, y in nautical miles around the track's mean latitude."""
+    scale = np.cos(np.radians(np.nanmean(lat))) if len(lat) else 1.0
+    return lon * 60.0 * scale, lat * 60.0
+
+
+def resample(times, interval):
+    """Indices keeping the first point of every interval (seconds), plus the last point."""
+    n = len(times)
+    if n == 0 or not interval:
+        return np.arange(n)
+    buckets = times // interval
+    keep = np.empty(n, dtype=bool)
+    keep[0] = True
+    keep[1:] = buckets[1:] != buckets[:-1]
+    keep[-1] = True
+    return np.flatnonzero(keep)
+
+
+def douglas_peucker_ranks(x, y):
+    """Douglas-Peucker importance of every point (the endpoints are infinite).
+
+    Simplifying to tolerance t keeps the points whose importance is above t.
+    A point's importance is capped by its parent split's, so the ranking is
+    monotone and a point budget keeps a valid Douglas-Peucker result.
+    """
+    n = len(x)
+    ranks = np.zeros(n)
+    if n == 0:
+        return ranks
+    ranks[0] = ranks[-1] = np.inf
+    stack = [(0, n - 1, np.inf)]
+    while stack:
+        first, last, parent = stack.pop()
+        if last - first < 2:
+            continue
+        # Perpendicular distances of the interior points to the chord, all at once
+        px, py = x[first + 1:last], y[first + 1:last]
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        chord = np.hypot(dx, dy)
+        if chord == 0:
+            distance = np.hypot(px - x[first], py - y[first])
+        else:
+            distance = np.abs(dx * (y[first] - py) - dy * (x[first] - px)) / chord
+        split = int(np.argmax(distance))
+        # Strictly below the parent, so a point budget never keeps a child
+        # without its parent
+        rank = min(distance[split], np.nextafter(parent, 0))
+        index = first + 1 + split
+        ranks[index] = rank
+        stack.append((first, index, rank))
+        stack.append((index, last, rank))
+    return ranks
+
+
+def visvalingam_ranks(x, y):
+    """Visvalingam-Whyatt effective area (square nm) of every point.
+
+    Points are removed smallest area first, and a point never ranks below
+    one removed before it, so cutting at any area or budget is consistent.
+    """
+    n = len(x)
+    ranks = np.full(n, np.inf)
+    if n < 3:
+        return ranks
+
+    def area(i, j, k):
+        return abs((x[j] - x[i]) * (y[k] - y[i]) - (x[k] - x[i]) * (y[j] - y[i])) / 2.0
+
+    previous = np.arange(-1, n - 1)
+    following = np.arange(1, n + 1)
+    # Initial areas for every interior point, vectorized
+    areas = np.abs((x[1:-1] - x[:-2]) * (y[2:] - y[:-2]) - (x[2:] - x[:-2]) * (y[1:-1] - y[:-2])) / 2.0
+    current = np.full(n, np.inf)
+    current[1:-1] = areas
+    heap = [(a, i) for i, a in enumerate(areas.tolist(), 1)]
+    heapq.heapify(heap)
+    floor = 0.0
+    while heap:
+        value, i = heapq.heappop(heap)
+        if value != current[i] or not np.isinf(ranks[i]):
+            continue  # Stale entry, or the point is already removed
+        # Strictly increasing, so cutting by budget follows the removal order
+        floor = value if value > floor else np.nextafter(floor, np.inf)
+        ranks[i] = floor
+        before, after = previous[i], following[i]
+        following[before] = after
+        previous[after] = before
+        for j in (before, after):
+            if 0 < j < n - 1 and np.isinf(ranks[j]):
+                current[j] = area(previous[j], j, following[j])
+                heapq.heappush(heap, (current[j], j))
+    return ranks
+
+
+def select(ranks, max_points=None, tolerance=None):
+    """Sorted indices of the points kept by a tolerance and/or a point budget."""
+    keep = np.arange(len(ranks))
+    if tolerance is not None:
+        keep = keep[ranks[keep] > tolerance]
+    if max_points is not None and len(keep) > max_points:
+        top = np.argsort(-ranks[keep], kind='stable')[:max(max_points, 2)]
+        keep = np.sort(keep[top])
+    return keep
+
+
+class Track:
+    """One vessel's positions in time order with their simplification ranks."""
+
+    def __init__(self, mmsi, positions, method):
+        self.mmsi = mmsi
+        self.positions = positions  # DataFrame with lat, lon and time columns
+        self.method = method
+        x, y = _project(positions['lat'].to_numpy(), positions['lon'].to_numpy())
+        if method == 'douglas-peucker':
+            self.ranks = douglas_peucker_ranks(x, y)
+        elif method == 'visvalingam':
+            self.ranks = visvalingam_ranks(x, y)
+        else:
+            self.ranks = np.full(len(positions), np.inf)
+
+    def simplified(self, max_points=None, tolerance=None):
+        """Positions kept for a point budget and/or tolerance.
+
+        tolerance is in nm for Douglas-Peucker and square nm for Visvalingam;
+        with method 'none' every position is kept.
+        """
+        if self.method == 'none':
+            return self.positions
+        return self.positions.iloc[select(self.ranks, max_points, tolerance)]
+
+
+def track_positions(df, mmsi, resample_seconds=None):
+    """Valid positions of one MMSI as lat, lon, time (epoch seconds), in time order."""
+    lat_name, lon_name = coordinate_columns(df)
+    rows = df[df['mmsi'] == mmsi]
+    lat = pd.to_numeric(rows[lat_name], errors='coerce').to_numpy(dtype=np.float64)
+    lon = pd.to_numeric(rows[lon_name], errors='coerce').to_numpy(dtype=np.float64)
+    time_name = time_column(rows)
+    times = epoch_seconds(rows[time_name]) if time_name else np.arange(len(rows), dtype=np.int64)
+    with np.errstate(invalid='ignore'):
+        valid = (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+    positions = pd.DataFrame({'lat': lat[valid], 'lon': lon[valid], 'time': times[valid]})
+    positions = positions.sort_values('time', kind='stable').reset_index(drop=True)
+    if resample_seconds:
+        positions = positions.iloc[resample(positions['time'].to_numpy(), resample_seconds)].reset_index(drop=True)
+    return positions
+
+
+class TrackCache:
+    """Prepared tracks keyed by (MMSI, resampling interval, method)."""
+
+    def __init__(self):
+        self.tracks = {}
+
+    def get(self, df, mmsi, resample_seconds=None, method='douglas-peucker'):
+        key = (mmsi, resample_seconds, method)
+        track = self.tracks.get(key)
+        if track is None:
+            track = self.tracks[key] = Track(mmsi, track_positions(df, mmsi, resample_seconds), method)
+        return track
+
+
+def simplify_track(df, mmsi, max_points=None, tolerance=None, resample_seconds=None,
+                   method='douglas-peucker', cache=None):
+    """Resampled, simplified positions of one MMSI (lat, lon, time columns)."""
+    if cache is not None:
+        track = cache.get(df, mmsi, resample_seconds, method)
+    else:
+        track = Track(mmsi, track_positions(df, mmsi, resample_seconds), method)
+    return track.simplified(max_points, tolerance)
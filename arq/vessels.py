@@ -0,0 +1,163 @@
+"""Incremental per-vessel state for batch and live feeds.
+
+``VesselTable`` keeps one small record per MMSI and updates it in O(1) for
+every decoded message (dict or records.Record): message count, first known
+name and ship type, the latest position with its speed and course, and the
+last time the vessel was heard. ``snapshot`` turns the current state into a
+DataFrame at any point, so a live feed never has to re-process its history.
+"""
+
+import os
+
+import pandas as pd
+
+SNAPSHOT_COLUMNS = [
+    'mmsi', 'message_count', 'name', 'type', 'type_code', 'latitude', 'longitude',
+    'speed', 'course', 'last_updated', 'last_seen',
+]
+
+
+# Helper to get vessel type as text
+def get_vessel_type(type_code):
+    if 20 <= type_code <= 29:
+        return f"Wing in ground (WIG) - {type_code}"
+    elif 30 <= type_code <= 39:
+        return f"Fishing - {type_code}"
+    elif 40 <= type_code <= 49:
+        return f"Tug - {type_code}"
+    elif 50 <= type_code <= 59:
+        return f"Dredger - {type_code}"
+    elif 60 <= type_code <= 69:
+        return f"Passenger - {type_code}"
+    elif 70 <= type_code <= 79:
+        return f"Cargo - {type_code}"
+    elif 80 <= type_code <= 89:
+        return f"Tanker - {type_code}"
+    elif 90 <= type_code <= 99:
+        return f"Other - {type_code}"
+    else:
+        return f"Unknown - {type_code}"
+
+
+def _receiver_time(msg):
+    # Receiver timestamps are 'YYYY-MM-DD HH:MM:SS' strings (which sort
+    # chronologically); an int 'timestamp' is the in-message UTC second
+    timestamp = msg.get('timestamp')
+    return timestamp if isinstance(timestamp, str) else None
+
+
+class VesselState:
+    """What is currently known about one vessel."""
+
+    __slots__ = (
+        'mmsi', 'message_count', 'name', 'type_code', 'has_position', 'latitude', 'longitude',
+        'speed', 'course', 'last_updated', 'last_seen',
+    )
+
+    def __init__(self, mmsi):
+        self.mmsi = mmsi
+        self.message_count = 0
+        self.name = None
+        self.type_code = None
+        self.has_position = False
+        self.latitude = None
+        self.longitude = None
+        self.speed = None
+        self.course = None
+        self.last_updated = None  # Receiver time of the latest position
+        self.last_seen = None  # Receiver time of the latest message
+
+    def update(self, msg):
+        self.message_count += 1
+        received = _receiver_time(msg)
+        if received is not None and (self.last_seen is None or received > self.last_seen):
+            self.last_seen = received
+
+        if self.name is None:
+            name = msg.get('vessel_name')
+            if name:
+                self.name = name
+        if self.type_code is None and 'ship_type' in msg:
+            self.type_code = msg['ship_type']
+
+        if msg.get('latitude') is not None:
+            # Latest by receiver time; ties and untimed messages go by arrival
+            if received is None or self.last_updated is None or received >= self.last_updated:
+                self.has_position = True
+                self.latitude = msg['latitude']
+                self.longitude = msg['longitude']
+                self.speed = msg.get('sog')
+                self.course = msg.get('cog')
+                if received is not None:
+                    self.last_updated = received
+
+    def summary(self):
+        """Return the vessel summary dict used by decoder.process_ais_file."""
+        info = {'mmsi': self.mmsi, 'message_count': self.message_count}
+        if self.name is not None:
+            info['name'] = self.name
+        if self.has_position:
+            info['latitude'] = self.latitude
+            info['longitude'] = self.longitude
+            if self.speed is not None:
+                info['speed'] = self.speed
+            if self.course is not None:
+                info['course'] = self.course
+        if self.type_code is not None:
+            info['type'] = get_vessel_type(self.type_code)
+        return info
+
+
+class VesselTable:
+    """Vessel states keyed by MMSI, in first-seen order."""
+
+    def __init__(self):
+        self.vessels = {}  # mmsi -> VesselState
+        self.messages = 0
+
+    def update(self, msg):
+        """Apply one decoded message; messages without an MMSI are ignored."""
+        mmsi = msg.get('mmsi')
+        if mmsi is None:
+            return
+        state = self.vessels.get(mmsi)
+        if state is None:
+            state = self.vessels[mmsi] = VesselState(mmsi)
+        state.update(msg)
+        self.messages += 1
+
+    def update_many(self, messages):
+        for msg in messages:
+            self.update(msg)
+
+    def __len__(self):
+        return len(self.vessels)
+
+    def __iter__(self):
+        return iter(self.vessels.values())
+
+    def __getitem__(self, mmsi):
+        return self.vessels[mmsi]
+
+    def snapshot(self):
+        """Return the current state as a DataFrame, one row per vessel."""
+        rows = []
+        for state in self.vessels.values():
+            type_code = state.type_code
+            rows.append((
+                state.mmsi, state.message_count, state.name,
+                get_vessel_type(type_code) if type_code is not None else None, type_code,
+                state.latitude, state.longitude, state.speed, state.course,
+                state.last_updated, state.last_seen,
+            ))
+        return pd.DataFrame.from_records(rows, columns=SNAPSHOT_COLUMNS)
+
+    def to_parquet(self, path):
+        """Write a snapshot to a Parquet file.
+
+        The file is replaced atomically, so readers polling it on a live
+        feed never see a partial write.
+        """
+        partial = path + '.tmp'
+        self.snapshot().to_parquet(partial, index=False, engine='pyarrow')
+        os.replace(partial, path)
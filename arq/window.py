@@ -0,0 +1,100 @@
+"""Time-windowed view of a live position stream.
+
+``SlidingWindow`` keeps the rows of the last ``window`` of stream time in a
+deque, oldest first, and the latest position of every vessel heard within
+it. Adding a row is O(1); rows that fall out of the window are evicted from
+the left of the deque as time advances, so memory and refresh cost depend on
+the window, not on how long the stream has run. ``changes`` reports only the
+vessels whose latest position appeared, moved or expired since the last
+call, which is what a map layer needs to update its markers.
+"""
+
+from collections import deque
+
+import pandas as pd
+
+
+def _valid_position(lat, lon):
+    return lat is not None and lon is not None and not (pd.isna(lat) or pd.isna(lon))
+
+
+class SlidingWindow:
+    """Rows of the last ``window`` of stream time and each vessel's latest position.
+
+    window is a timedelta (or anything that can be subtracted from the row
+    times). Rows are expected roughly in time order; a late row is kept
+    until the window moves past it, but never replaces a newer position.
+    """
+
+    def __init__(self, window, time_column='time', lat_column='lat', lon_column='lon'):
+        self.window = window
+        self.time_column = time_column
+        self.lat_column = lat_column
+        self.lon_column = lon_column
+        self.rows = deque()  # (time, mmsi, row), in arrival order
+        self.latest = {}  # mmsi -> (time, row) of the latest valid position
+        self.current_time = None  # Latest time seen
+        self.updated = set()  # MMSIs whose latest position changed since changes()
+        self.removed = set()  # MMSIs that left the window since changes()
+        self.evicted = 0
+
+    def add(self, row):
+        """Add one row (a dict, Series or Record) and evict expired rows."""
+        time = row[self.time_column]
+        if pd.isna(time):
+            return
+        mmsi = row['mmsi']
+        self.rows.append((time, mmsi, row))
+        if self.current_time is None or time > self.current_time:
+            self.current_time = time
+
+        if _valid_position(row[self.lat_column], row[self.lon_column]):
+            latest = self.latest.get(mmsi)
+            if latest is None or time >= latest[0]:
+                self.latest[mmsi] = (time, row)
+                self.updated.add(mmsi)
+                self.removed.discard(mmsi)
+        self.expire()
+
+    def add_many(self, rows):
+        for row in rows:
+            self.add(row)
+
+    def expire(self):
+        """Drop rows older than the window; returns how many were dropped."""
+        if self.current_time is None:
+            return 0
+        cutoff = self.current_time - self.window
+        rows = self.rows
+        dropped = 0
+        while rows and rows[0][0] < cutoff:
+            _, mmsi, _ = rows.popleft()
+            dropped += 1
+            latest = self.latest.get(mmsi)
+            # The vessel's newest position is older than the cutoff, so every
+            # position it had in the window has gone
+            if latest is not None and latest[0] < cutoff:
+                del self.latest[mmsi]
+                self.updated.discard(mmsi)
+                self.removed.add(mmsi)
+        self.evicted += dropped
+        return dropped
+
+    def changes(self):
+        """Return (updated {mmsi: row}, removed {mmsi}) since the last call."""
+        updated = {mmsi: self.latest[mmsi][1] for mmsi in self.updated}
+        removed = self.removed
+        self.updated = set()
+        self.removed = set()
+        return updated, removed
+
+    def __len__(self):
+        return len(self.rows)
+
+    def positions(self):
+        """The latest position of every vessel in the window, as a DataFrame."""
+        return pd.DataFrame([row for _, row in self.latest.values()])
+
+    def to_frame(self):
+        """All rows currently in the window, as a DataFrame."""
+        return pd.DataFrame([row for _, _, row in self.rows])
@@ -1,82 +1,122 @@
-from pyais.stream import FileReaderStream
-import logging
+import math
+import os
+import sys
 import pandas as pd
-import numpy as np
-from datetime import datetime
-
-# Configure logging to write to a file
-logging.basicConfig(
-    filename='ais_decode_errors.log',
-    level=logging.ERROR,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "arq"))
+from cleaning import clean
+from enrichment import StaticState
+from errors import BIT_LENGTH, MALFORMED, ORPHAN_FRAGMENT, ErrorAccounting, ErrorSink, check_bit_length
+from linereader import read_lines
+from prefilter import Prefilter
+from projection import Projection
+from reassembly import Reassembler, raw_line
+from records import Status
+from timestamps import extract_timestamp, parse_column, to_datetime64
 
 filename = "20240911_06053.txt"
+error_samples = "ais_decode_errors.jsonl"
 output_parquet = "ais_data_20240911_cleaned.parquet"
 
-# Lists to store data for DataFrame
-ship_data = []  # For static data (ship names, call signs)
+
+# Converters matching the values pyais produced for this output
+def degrees(not_available):
+    return lambda raw: None if raw == not_available else round(raw / 600000.0, 6)
+
+def turn(raw):
+    if raw == 0 or abs(raw) >= 127:
+        return float(raw)  # Not turning, turning without indicator, or -128 (not available)
+    return math.copysign(round((raw / 4.733) ** 2), raw)
+
+# Only the fields below are decoded. Position reports (1, 2, 3, 18, 19) and
+# static data (5, 19, 24) feed the output; other types are skipped from the
+# message type alone, and type 24 part B decodes only its call sign.
+projection = Projection(
+    {
+        "mmsi": "mmsi",
+        "lat": ("latitude", degrees(0x3412140)),
+        "lon": ("longitude", degrees(0x6791AC0)),
+        "sog": "sog",
+        "cog": "cog",
+        "nas": ("navigation_status", str),
+        "heading": "true_heading",
+        "rot": ("rot", turn),
+        "mi": "special_manoeuvre",  # Maneuver indicator
+        "vessel_name": "vessel_name",
+        "call_sign": "call_sign",
+    },
+    msg_types=(1, 2, 3, 5, 18, 19, 24),
+)
+
+# Latest static data (ship names, call signs) per MMSI
+static_state = StaticState()
+# List to store data for DataFrame
 position_data = []  # For dynamic data (positions, speeds, etc.)
 
 successful_count = 0
-error_count = 0
-
-with FileReaderStream(filename) as stream:
-    for msg in stream:
-        try:
-            decoded = msg.decode()
-            successful_count += 1
-
-            mmsi = getattr(decoded, "mmsi", None)
-            if not mmsi:
-                continue
-
-            # Extract timestamp from raw message
-            raw_msg = str(msg.raw)
-            timestamp = raw_msg.split(',')[-1] if ',' in raw_msg else None
-
-            # Message Type 24 Part A (ship name) and Part B (call sign)
-            if hasattr(decoded, "shipname"):
-                ship_data.append({
-                    "mmsi": mmsi,
-                    "vessel_name": decoded.shipname.strip(),
-                    "call_sign": getattr(decoded, "callsign", None),
-                    "timestamp": timestamp
-                })
-
-            # Message Type 1, 2, 3, 18 (position reports)
-            if hasattr(decoded, "lat") and hasattr(decoded, "lon"):
-                position_data.append({
-                    "mmsi": mmsi,
-                    "lat": decoded.lat if decoded.lat != 91.0 else None,
-                    "lon": decoded.lon if decoded.lon != 181.0 else None,
-                    "sog": getattr(decoded, "speed", None),
-                    "cog": getattr(decoded, "course", None),
-                    "nas": str(getattr(decoded, "status", None)) if hasattr(decoded, "status") else None,
-                    "heading": getattr(decoded, "heading", None),
-                    "rot": getattr(decoded, "turn", None),  # Rate of turn
-                    "mi": getattr(decoded, "maneuver", None),  # Maneuver indicator
-                    "timestamp": timestamp
-                })
-
-        except Exception as e:
-            error_count += 1
-            logging.error(f"Failed to decode message: {msg.raw} - Error: {str(e)}")
-            print(f"Skipping invalid message: {msg.raw} - Error: {str(e)}")
-
-# Convert to DataFrames
-ship_df = pd.DataFrame(ship_data)
-position_df = pd.DataFrame(position_data)
-
-# Merge ship names and call signs into position data
-if not ship_df.empty and not position_df.empty:
-    combined_df = position_df.merge(
-        ship_df[["mmsi", "vessel_name", "call_sign"]].drop_duplicates(),
-        on="mmsi",
-        how="left"
-    )
-else:
-    combined_df = position_df
+skipped_count = 0
+# Failures are counted by category; only a rate-limited sample is written
+errors = ErrorAccounting(ErrorSink(error_samples))
+# Junk lines are rejected from their fields and checksum before they are decoded
+prefilter = Prefilter(on_reject=lambda line, reason: errors.record(reason, line))
+reassembler = Reassembler(on_discard=lambda lines, reason: [
+    errors.record(MALFORMED if reason == "malformed" else ORPHAN_FRAGMENT, line) for line in lines
+])
+
+for message in reassembler.process(prefilter.filter(read_lines(filename))):
+    raw = raw_line(message)
+    # Truncated payloads would decode with missing bits read as zero; only
+    # the fields the projection reads need to be present
+    bit_error = check_bit_length(message.payload, message.fill_bits, projection.min_bits)
+    if bit_error:
+        errors.record(BIT_LENGTH, raw, bit_error)
+        continue
+    status, decoded, error = projection.try_decode(message.payload)
+    if status is Status.FILTERED:
+        skipped_count += 1
+        continue
+    if decoded is None:
+        errors.record(status.value, raw, error)
+        continue
+    successful_count += 1
+
+    mmsi = decoded.get("mmsi")
+    if not mmsi:
+        continue
+
+    # Extract timestamp from raw message
+    timestamp = extract_timestamp(raw)
+
+    # Message Type 5, 19 and 24 Part A (ship name) / Part B (call sign):
+    # remember the latest values for this MMSI
+    if "vessel_name" in decoded or "call_sign" in decoded:
+        static_state.update(
+            mmsi,
+            vessel_name=decoded.get("vessel_name", "").strip(),
+            call_sign=decoded.get("call_sign", "").strip(),
+        )
+
+    # Message Type 1, 2, 3, 18, 19 (position reports)
+    if "lat" in decoded and "lon" in decoded:
+        position_data.append({
+            "mmsi": mmsi,
+            "lat": decoded["lat"],
+            "lon": decoded["lon"],
+            "sog": decoded.get("sog"),
+            "cog": decoded.get("cog"),
+            "nas": decoded.get("nas"),
+            "heading": decoded.get("heading"),
+            "rot": decoded.get("rot"),  # Rate of turn
+            "mi": decoded.get("mi"),  # Maneuver indicator
+            "timestamp": timestamp,
+            # Static data known for this MMSI when the position arrived
+            **static_state.lookup(mmsi)
+        })
+
+errors.close()
+
+# Convert to DataFrame; static data was attached as positions arrived
+combined_df = pd.DataFrame(position_data)
 
 # Add IMO column (set to None since we don't have MessageType5)
 combined_df["imo"] = None
@@ -90,39 +130,14 @@ combined_df = combined_df.rename(columns={"timestamp": "time"})
 combined_df = combined_df.dropna(subset=["mmsi", "time"])
 
 # 2. Convert time to datetime and validate
-combined_df["time"] = pd.to_datetime(combined_df["time"], errors="coerce")
+epochs, unparseable_times = parse_column(combined_df["time"].to_numpy())
+combined_df["time"] = to_datetime64(epochs)
 combined_df = combined_df.dropna(subset=["time"])  # Drop rows with invalid timestamps
 
-# 3. Validate numerical ranges
-# Latitude: [-90, 90]
-combined_df.loc[(combined_df["lat"] < -90) | (combined_df["lat"] > 90), "lat"] = np.nan
-# Longitude: [-180, 180]
-combined_df.loc[(combined_df["lon"] < -180) | (combined_df["lon"] > 180), "lon"] = np.nan
-# Speed over ground: [0, 50] knots (assuming 50 knots as max realistic speed)
-combined_df.loc[(combined_df["sog"] < 0) | (combined_df["sog"] > 50), "sog"] = np.nan
-# Course over ground: [0, 360]
-combined_df.loc[(combined_df["cog"] < 0) | (combined_df["cog"] > 360), "cog"] = np.nan
-# Heading: [0, 360]
-combined_df.loc[(combined_df["heading"] < 0) | (combined_df["heading"] > 360), "heading"] = np.nan
-# Rate of turn: [-720, 720] degrees per minute (AIS standard)
-combined_df.loc[(combined_df["rot"] < -720) | (combined_df["rot"] > 720), "rot"] = np.nan
-# Maneuver indicator: [0, 2] (AIS standard: 0=not available, 1=not engaged, 2=special maneuver)
-combined_df.loc[(combined_df["mi"] < 0) | (combined_df["mi"] > 2), "mi"] = np.nan
-
-# 4. Clean string fields
-combined_df["vessel_name"] = combined_df["vessel_name"].str.strip().fillna("Unknown").astype("string")
-combined_df["call_sign"] = combined_df["call_sign"].str.strip().fillna("").astype("string")
-combined_df["nas"] = combined_df["nas"].str.strip().fillna("Unknown").astype("string")
-
-# 5. Handle MMSI-vessel name inconsistencies
-mmsi_vessel_counts = combined_df.groupby("mmsi")["vessel_name"].nunique()
-inconsistent_mmsi = mmsi_vessel_counts[mmsi_vessel_counts > 1].index
-if len(inconsistent_mmsi) > 0:
-    print(f"Warning: MMSI with multiple vessel names detected: {inconsistent_mmsi.tolist()}")
-    # Take the most frequent vessel name for each MMSI
-    most_frequent_names = combined_df.groupby("mmsi")["vessel_name"].agg(lambda x: x.mode()[0])
-    for mmsi in inconsistent_mmsi:
-        combined_df.loc[combined_df["mmsi"] == mmsi, "vessel_name"] = most_frequent_names[mmsi]
+# 3-5. Range/sentinel checks, string cleanup and MMSI-vessel name resolution
+cleaning_stats = clean(combined_df)
+if cleaning_stats["inconsistent_mmsi"]:
+    print(f"Warning: MMSI with multiple vessel names detected: {cleaning_stats['inconsistent_mmsi']}")
 
 # 6. Remove duplicates (same MMSI and time)
 combined_df = combined_df.drop_duplicates(subset=["mmsi", "time"], keep="last")
@@ -149,7 +164,10 @@ combined_df.to_parquet(output_parquet, index=False, engine="pyarrow")
 # Print summary
 print("\n=== AIS Decoding Summary ===")
 print(f"Successfully decoded messages: {successful_count}")
-print(f"Messages with errors: {error_count}")
+print(f"Skipped messages (types without output columns): {skipped_count}")
+errors.print_summary()
+print(f"Unparseable timestamps: {unparseable_times}")
+print(f"Invalid values set to NaN: {cleaning_stats['invalid']}")
 print(f"Data saved to: {output_parquet}")
 print("\nSample of the cleaned data:")
 print(combined_df.head())
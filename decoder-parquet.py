@@ -1,67 +1,78 @@
-from pyais.stream import FileReaderStream
-import logging
+from pyais.exceptions import AISBaseException
+from pyais.stream import IterMessages
+import os
+import sys
 import pandas as pd
 
-# Configure logging to write to a file
-logging.basicConfig(
-    filename='ais_decode_errors.log',
-    level=logging.ERROR,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "arq"))
+from errors import BIT_LENGTH, ErrorAccounting, ErrorSink, check_bit_length
+from linereader import read_lines
+from prefilter import Prefilter
+from timestamps import extract_timestamp, parse_column, to_datetime64
 
 filename = "20240911_06053.txt"
+error_samples = "ais_decode_errors.jsonl"
 output_parquet = "ais_data_20240911.parquet"
+print_messages = False  # Print every decoded message (slows the decode loop down)
 
 # Lists to store data for DataFrame
 ship_data = []  # For static data (ship names, call signs)
 position_data = []  # For dynamic data (positions, speeds, etc.)
 
 successful_count = 0
-error_count = 0
+# Failures are counted by category; only a rate-limited sample is written
+errors = ErrorAccounting(ErrorSink(error_samples))
+# Junk lines are rejected from their fields and checksum before pyais sees them
+prefilter = Prefilter(on_reject=lambda line, reason: errors.record(reason, line))
 
-with FileReaderStream(filename) as stream:
+with IterMessages(line.encode() for line in prefilter.filter(read_lines(filename))) as stream:
     for msg in stream:
+        # pyais decodes truncated payloads without complaint
+        bit_error = check_bit_length(msg.payload, msg.fill_bits)
+        if bit_error:
+            errors.record(BIT_LENGTH, msg.raw, bit_error)
+            continue
         try:
             decoded = msg.decode()
-            successful_count += 1
-            print(decoded)  # Print each decoded message as it processes
-
-            mmsi = getattr(decoded, "mmsi", None)
-            if not mmsi:
-                continue
-
-            # Extract timestamp from raw message
-            raw_msg = str(msg.raw)
-            timestamp = raw_msg.split(',')[-1] if ',' in raw_msg else None
-
-            # Message Type 24 Part A (ship name) and Part B (call sign)
-            if hasattr(decoded, "shipname"):
-                ship_data.append({
-                    "mmsi": mmsi,
-                    "vessel_name": decoded.shipname.strip(),
-                    "call_sign": getattr(decoded, "callsign", None),
-                    "timestamp": timestamp
-                })
-
-            # Message Type 1, 2, 3, 18 (position reports)
-            if hasattr(decoded, "lat") and hasattr(decoded, "lon"):
-                position_data.append({
-                    "mmsi": mmsi,
-                    "lat": decoded.lat if decoded.lat != 91.0 else None,
-                    "lon": decoded.lon if decoded.lon != 181.0 else None,
-                    "sog": getattr(decoded, "speed", None),
-                    "cog": getattr(decoded, "course", None),
-                    "nas": str(getattr(decoded, "status", None)) if hasattr(decoded, "status") else None,
-                    "heading": getattr(decoded, "heading", None),
-                    "rot": getattr(decoded, "turn", None),  # Rate of turn
-                    "mi": getattr(decoded, "maneuver", None),  # Maneuver indicator
-                    "timestamp": timestamp
-                })
-
-        except Exception as e:
-            error_count += 1
-            logging.error(f"Failed to decode message: {msg.raw} - Error: {str(e)}")
-            print(f"Skipping invalid message: {msg.raw} - Error: {str(e)}")
+        except AISBaseException as e:  # pyais reports what it cannot parse by raising
+            errors.record_exception(e, msg.raw)
+            continue
+        successful_count += 1
+        if print_messages:
+            print(decoded)
+
+        mmsi = getattr(decoded, "mmsi", None)
+        if not mmsi:
+            continue
+
+        # Extract timestamp from raw message
+        timestamp = extract_timestamp(msg.raw)
+
+        # Message Type 24 Part A (ship name) and Part B (call sign)
+        if hasattr(decoded, "shipname"):
+            ship_data.append({
+                "mmsi": mmsi,
+                "vessel_name": decoded.shipname.strip(),
+                "call_sign": getattr(decoded, "callsign", None),
+                "timestamp": timestamp
+            })
+
+        # Message Type 1, 2, 3, 18 (position reports)
+        if hasattr(decoded, "lat") and hasattr(decoded, "lon"):
+            position_data.append({
+                "mmsi": mmsi,
+                "lat": decoded.lat if decoded.lat != 91.0 else None,
+                "lon": decoded.lon if decoded.lon != 181.0 else None,
+                "sog": getattr(decoded, "speed", None),
+                "cog": getattr(decoded, "course", None),
+                "nas": str(getattr(decoded, "status", None)) if hasattr(decoded, "status") else None,
+                "heading": getattr(decoded, "heading", None),
+                "rot": getattr(decoded, "turn", None),  # Rate of turn
+                "mi": getattr(decoded, "maneuver", None),  # Maneuver indicator
+                "timestamp": timestamp
+            })
+
+errors.close()
 
 # Convert to DataFrames
 ship_df = pd.DataFrame(ship_data)
@@ -91,7 +102,8 @@ combined_df = combined_df[[
 # Ensure consistent data types
 combined_df["mmsi"] = combined_df["mmsi"].astype("int64")
 combined_df["vessel_name"] = combined_df["vessel_name"].fillna("Unknown").astype("string")
-combined_df["time"] = pd.to_datetime(combined_df["time"], errors="coerce")
+epochs, unparseable_times = parse_column(combined_df["time"].to_numpy())
+combined_df["time"] = to_datetime64(epochs)
 combined_df["lat"] = combined_df["lat"].astype("float64")
 combined_df["lon"] = combined_df["lon"].astype("float64")
 combined_df["heading"] = combined_df["heading"].astype("float64")
@@ -109,7 +121,8 @@ combined_df.to_parquet(output_parquet, index=False, engine="pyarrow")
 # Print summary
 print("\n=== AIS Decoding Summary ===")
 print(f"Successfully decoded messages: {successful_count}")
-print(f"Messages with errors: {error_count}")
+errors.print_summary()
+print(f"Unparseable timestamps: {unparseable_times}")
 print(f"Data saved to: {output_parquet}")
 print("\nSample of the combined data:")
 print(combined_df.head())
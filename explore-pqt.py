@@ -1,57 +1,68 @@
-import pandas as pd
+import os
+import sys
 from datetime import datetime
 
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "arq"))
+from dataset import LazyDataset
+
 print("=== STARTING AIS DATA EXPLORATION ===")
-print("Loading parquet file from ais_data_20240911.parquet...")
-df = pd.read_parquet("ais_data_20240911_cleaned.parquet")
+print("Opening parquet file ais_data_20240911_cleaned.parquet...")
+# Only the schema is read here; each section below reads just its columns
+data = LazyDataset("ais_data_20240911_cleaned.parquet")
+dtypes = data.dtypes
 
 # Basic information about the DataFrame
 print("\n=== BASIC DATAFRAME INFORMATION ===")
-print(f"DataFrame shape: {df.shape}")  # Shows (rows, columns)
+print(f"DataFrame shape: {(data.num_rows, len(data.columns))}")  # Shows (rows, columns)
 print("\nDetailed DataFrame information:")
-print(df.info())  # Overview of columns, data types and non-null values
+# Non-null counts come from the Parquet column statistics
+print(pd.DataFrame({'non-null': data.num_rows - data.null_counts(), 'dtype': dtypes}))
 print("\nStatistical summary of numeric columns:")
-print(df.describe())  # Statistical summary of numeric columns
+numeric_columns = [col for col, dtype in dtypes.items() if pd.api.types.is_numeric_dtype(dtype)]
+print(data.load(numeric_columns).describe())  # Statistical summary of numeric columns
 
 # View the data
 print("\n=== DATA PREVIEW ===")
 print("First 5 rows of data:")
-print(df.head())  # First 5 rows
+print(data.head())  # First 5 rows
 print("\nLast 5 rows of data:")
-print(df.tail())  # Last 5 rows
+print(data.tail())  # Last 5 rows
 
 # Column information
 print("\n=== COLUMN DETAILS ===")
 print("Column names:")
-print(df.columns)  # List column names
+print(data.columns)  # List column names
 print("\nData types of each column:")
-print(df.dtypes)  # Data types of each column
+print(dtypes)  # Data types of each column
 
 print("\n=== DATA EXPLORATION COMPLETE ===")
-print(f"Total records analyzed: {len(df)}")
+print(f"Total records analyzed: {data.num_rows}")
 print(f"Script execution completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
 # Check for vessel name columns
 print("\n=== SEARCHING FOR VESSEL NAMES ===")
 
 # Common vessel name column possibilities
-name_columns = [col for col in df.columns if 'name' in col.lower() or 'vessel' in col.lower() or 'ship' in col.lower()]
+name_columns = [col for col in data.columns if 'name' in col.lower() or 'vessel' in col.lower() or 'ship' in col.lower()]
 if name_columns:
     print(f"Potential vessel name columns found: {name_columns}")
     for col in name_columns:
         print(f"\nSample values from '{col}':")
-        print(df[col].value_counts().head(10))
+        print(data.load([col])[col].value_counts().head(10))
 else:
     print("No obvious vessel name columns found.")
     
     # Try to examine all string columns for potential vessel names
     print("\nExamining string columns for potential vessel names:")
-    string_cols = df.select_dtypes(include=['object']).columns
+    string_cols = [col for col, dtype in dtypes.items() if dtype == object]
     for col in string_cols:
-        sample_values = df[col].dropna().unique()[:5]  # First 5 unique non-null values
+        sample_values = data.load([col])[col].dropna().unique()[:5]  # First 5 unique non-null values
         print(f"\nColumn '{col}' sample values: {sample_values}")
         
 print("\nTo extract vessel names from message type 5, which typically contains vessel names:")
+df = data.load(['message_id', 'shipname'])
 if 'message_id' in df.columns and 5 in df['message_id'].unique():
     type5_msgs = df[df['message_id'] == 5]
     if 'shipname' in type5_msgs.columns: